@@ -0,0 +1,267 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_STORE_PATH = os.path.join("cache", "audio")
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+CHUNK_SIZE = 64 * 1024
+
+def parse_size(text):
+    # "500MB", "2G", "1048576"
+    units = {"k": 1024, "m": 1024 ** 2, "g": 1024 ** 3, "t": 1024 ** 4}
+    text = text.strip().lower().rstrip("b")
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+class AudioStore:
+    """
+    Content-addressed audio files under `root`: objects/<sha256[:2]>/<sha256><ext>.
+    An SQLite index maps poem ids to objects and records when each object was
+    last used; once the store grows past `max_bytes` the least recently used
+    objects are evicted. Unfinished downloads wait in partial/ and are resumed
+    with an HTTP range request. Safe to share between threads.
+    """
+    def __init__(self, root=DEFAULT_STORE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(root, "partial"), exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS objects (
+                sha256 TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS poems (
+                poem_id TEXT PRIMARY KEY,
+                audio_url TEXT NOT NULL,
+                sha256 TEXT NOT NULL
+            );
+        """)
+        self.db.commit()
+        self.lock = threading.Lock()
+
+    # --- Lookups ---
+    def lookup(self, poem_id, audio_url):
+        """
+        Return the stored object's path for `poem_id` when it was fetched from
+        `audio_url` (by this or any other poem), else None.
+        """
+        with self.lock:
+            row = self.db.execute("""
+                SELECT o.sha256, o.path FROM poems p JOIN objects o ON o.sha256 = p.sha256
+                WHERE p.audio_url = ?
+                ORDER BY p.poem_id = ? DESC
+                LIMIT 1
+            """, (audio_url, str(poem_id))).fetchone()
+            if row is None or not os.path.exists(os.path.join(self.root, row[1])):
+                return None
+            self.db.execute(
+                "INSERT OR REPLACE INTO poems (poem_id, audio_url, sha256) VALUES (?, ?, ?)",
+                (str(poem_id), audio_url, row[0]),
+            )
+            self.db.execute("UPDATE objects SET last_used = ? WHERE sha256 = ?", (time.time(), row[0]))
+            self.db.commit()
+        return row[1]
+
+    def add(self, poem_id, audio_url, partial_path):
+        """Move a finished download into the store and map `poem_id` to it; returns its relative path."""
+        digest = hashlib.sha256()
+        with open(partial_path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+        sha256 = digest.hexdigest()
+        ext = os.path.splitext(audio_url.split("?", 1)[0])[1][:8] or ".bin"
+        path = os.path.join("objects", sha256[:2], sha256 + ext)
+        full_path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        size = os.path.getsize(partial_path)
+        with self.lock:
+            if os.path.exists(full_path):
+                # Same content already stored under another poem or URL.
+                os.remove(partial_path)
+            else:
+                os.replace(partial_path, full_path)
+            self.db.execute(
+                "INSERT OR REPLACE INTO objects (sha256, path, size, last_used) VALUES (?, ?, ?, ?)",
+                (sha256, path, size, time.time()),
+            )
+            self.db.execute(
+                "INSERT OR REPLACE INTO poems (poem_id, audio_url, sha256) VALUES (?, ?, ?)",
+                (str(poem_id), audio_url, sha256),
+            )
+            self.db.commit()
+        return path
+
+    # --- Eviction ---
+    def total_bytes(self):
+        with self.lock:
+            return self.db.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+
+    def evict(self, keep=()):
+        """Delete least recently used objects (never those in `keep`) until the store fits in max_bytes."""
+        keep = set(keep)
+        evicted = 0
+        with self.lock:
+            total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+            rows = self.db.execute("SELECT sha256, path, size FROM objects ORDER BY last_used").fetchall()
+            for sha256, path, size in rows:
+                if total <= self.max_bytes:
+                    break
+                if sha256 in keep:
+                    continue
+                try:
+                    os.remove(os.path.join(self.root, path))
+                except FileNotFoundError:
+                    pass
+                self.db.execute("DELETE FROM objects WHERE sha256 = ?", (sha256,))
+                self.db.execute("DELETE FROM poems WHERE sha256 = ?", (sha256,))
+                total -= size
+                evicted += 1
+            self.db.commit()
+        return evicted
+
+    def sha256_of(self, path):
+        return os.path.basename(path).split(".", 1)[0]
+
+    def write_manifest(self):
+        """Write manifest.json: {poem id: {"file", "audio_url", "sha256", "size"}} for everything stored."""
+        with self.lock:
+            rows = self.db.execute("""
+                SELECT p.poem_id, o.path, p.audio_url, o.sha256, o.size
+                FROM poems p JOIN objects o ON o.sha256 = p.sha256 ORDER BY p.poem_id
+            """).fetchall()
+        manifest = {
+            poem_id: {"file": path, "audio_url": url, "sha256": sha256, "size": size}
+            for poem_id, path, url, sha256, size in rows
+        }
+        tmp_path = os.path.join(self.root, "manifest.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp_path, os.path.join(self.root, "manifest.json"))
+        return manifest
+
+# --- Downloading ---
+class AudioFetcher:
+    """Downloads into an AudioStore over one pooled session, resuming partial files with Range requests."""
+    def __init__(self, store, workers=8, attempts=4, timeout=60):
+        self.store = store
+        self.workers = workers
+        self.attempts = attempts
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.bytes_downloaded = 0
+        self.resumed = 0
+        self.lock = threading.Lock()
+        # One download per URL at a time; poems sharing a file wait for the first.
+        self.url_locks = {}
+
+    def _partial_path(self, audio_url):
+        return os.path.join(self.store.root, "partial", hashlib.sha256(audio_url.encode("utf-8")).hexdigest())
+
+    def _download(self, audio_url):
+        """Fetch `audio_url` into its partial file, resuming what is there; returns the partial path."""
+        part = self._partial_path(audio_url)
+        etag_path = part + ".etag"
+        for attempt in range(self.attempts):
+            offset = os.path.getsize(part) if os.path.exists(part) else 0
+            headers = {}
+            if offset:
+                headers["Range"] = f"bytes={offset}-"
+                if os.path.exists(etag_path):
+                    # Only resume if the file has not changed since the first part was fetched.
+                    with open(etag_path, "r", encoding="utf-8") as f:
+                        headers["If-Range"] = f.read()
+            try:
+                with self.session.get(audio_url, headers=headers, stream=True, timeout=self.timeout) as response:
+                    if response.status_code == 416:
+                        # Only a partial exactly as long as the remote file is complete.
+                        total = response.headers.get("Content-Range", "").rpartition("/")[2]
+                        if total.isdigit() and int(total) == offset:
+                            return part
+                        for stale in (part, etag_path):
+                            if os.path.exists(stale):
+                                os.remove(stale)
+                        raise requests.exceptions.HTTPError(
+                            f"partial file of {offset} bytes does not match the remote size "
+                            f"({response.headers.get('Content-Range')}); starting over", response=response)
+                    response.raise_for_status()
+                    if response.status_code == 206:
+                        mode = "ab"
+                        with self.lock:
+                            self.resumed += 1
+                    else:
+                        mode = "wb"
+                    if response.headers.get("ETag"):
+                        with open(etag_path, "w", encoding="utf-8") as f:
+                            f.write(response.headers["ETag"])
+                    expected = response.headers.get("Content-Length")
+                    written = 0
+                    try:
+                        with open(part, mode) as f:
+                            for chunk in response.iter_content(CHUNK_SIZE):
+                                f.write(chunk)
+                                written += len(chunk)
+                    finally:
+                        # Whatever arrived stays in the partial file for the next attempt.
+                        with self.lock:
+                            self.bytes_downloaded += written
+                    if expected is not None and written < int(expected):
+                        raise requests.exceptions.ChunkedEncodingError("connection closed early")
+                return part
+            except requests.exceptions.RequestException as e:
+                if attempt == self.attempts - 1:
+                    raise
+                print(f"Download of {audio_url} interrupted ({e}); resuming.")
+                time.sleep(min(2 ** attempt, 10) * 0.1)
+
+    def fetch(self, poem_id, audio_url):
+        """Return (store-relative path, downloaded now) for `poem_id`'s audio, downloading it if needed."""
+        with self.lock:
+            url_lock = self.url_locks.setdefault(audio_url, threading.Lock())
+        with url_lock:
+            path = self.store.lookup(poem_id, audio_url)
+            if path is not None:
+                return path, False
+            part = self._download(audio_url)
+            path = self.store.add(poem_id, audio_url, part)
+            if os.path.exists(part + ".etag"):
+                os.remove(part + ".etag")
+            return path, True
+
+    def fetch_all(self, items):
+        """
+        Fetch (poem id, audio url) items with `workers` concurrent downloads.
+        Returns ({poem id: relative path}, {poem id: error}).
+        """
+        paths, errors = {}, {}
+        downloaded = 0
+        start = time.monotonic()
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="audio") as pool:
+            futures = {pool.submit(self.fetch, poem_id, url): poem_id for poem_id, url in items}
+            for future in as_completed(futures):
+                poem_id = futures[future]
+                try:
+                    paths[poem_id], fresh = future.result()
+                    downloaded += fresh
+                except Exception as e:
+                    errors[poem_id] = e
+                    print(f"Failed to fetch audio for poem {poem_id}: {e}")
+        elapsed = time.monotonic() - start
+        evicted = self.store.evict(keep={self.store.sha256_of(path) for path in paths.values()})
+        print(f"Audio: {len(paths)} stored ({downloaded} downloaded, {len(paths) - downloaded} already cached, "
+              f"{self.resumed} resumed), {len(errors)} failed; "
+              f"{self.bytes_downloaded / 1024 ** 2:.1f} MiB in {elapsed:.1f}s; {evicted} evicted.")
+        return paths, errors
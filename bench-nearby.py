@@ -0,0 +1,84 @@
+import os
+import time
+import random
+import argparse
+import statistics
+import psycopg2
+from dotenv import load_dotenv
+
+# --- Database Connection ---
+def connect_db():
+    load_dotenv()
+    conn_str = os.environ.get("SUPABASE_DB_URL")
+    if not conn_str:
+         raise Exception("SUPABASE_DB_URL not set.")
+    return psycopg2.connect(conn_str)
+
+def offset_session(cur, lat, lon, clicks):
+    """Per-click latencies of "next poem" with get_poems_nearby's offset paging."""
+    latencies = []
+    for offset in range(clicks):
+        start = time.perf_counter()
+        cur.execute("SELECT * FROM get_poems_nearby(%s, %s, 1, %s);", (lat, lon, offset))
+        rows = cur.fetchall()
+        latencies.append(time.perf_counter() - start)
+        if not rows:
+            break
+    return latencies
+
+def cursor_session(cur, lat, lon, clicks):
+    """Per-click latencies of "next poem" with get_poems_nearby_after's keyset cursor."""
+    latencies = []
+    cursor = None
+    for _ in range(clicks):
+        start = time.perf_counter()
+        cur.execute("SELECT cursor FROM get_poems_nearby_after(%s, %s, 1, %s);", (lat, lon, cursor))
+        rows = cur.fetchall()
+        latencies.append(time.perf_counter() - start)
+        if not rows:
+            break
+        cursor = rows[0][0]
+    return latencies
+
+def depth_buckets(clicks):
+    # Click ranges to report: 1-10, 11-100, 101-1000, ...
+    start, end = 0, 10
+    while start < clicks:
+        yield start, min(end, clicks)
+        start, end = end, end * 10
+
+def report(name, sessions, clicks):
+    print(name)
+    for start, end in depth_buckets(clicks):
+        samples = [s for latencies in sessions for s in latencies[start:end]]
+        if not samples:
+            break
+        samples.sort()
+        p50 = statistics.median(samples) * 1000
+        p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000
+        print(f"  clicks {start + 1:>5}-{end:<5} p50 {p50:7.2f} ms  p99 {p99:7.2f} ms  ({len(samples)} samples)")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare per-click latency of offset and cursor paging for nearby poems.")
+    parser.add_argument("--clicks", type=int, default=1000, help="Clicks of \"next poem\" per session.")
+    parser.add_argument("--sessions", type=int, default=5, help="Sessions, each from a random origin.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--skip-offset", action="store_true", help="Only time the cursor function.")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    origins = [(rng.uniform(-60, 70), rng.uniform(-180, 180)) for _ in range(args.sessions)]
+    conn = connect_db()
+    conn.autocommit = True
+    cur = conn.cursor()
+
+    if not args.skip_offset:
+        report("get_poems_nearby (offset)", [offset_session(cur, lat, lon, args.clicks) for lat, lon in origins], args.clicks)
+    report("get_poems_nearby_after (cursor)", [cursor_session(cur, lat, lon, args.clicks) for lat, lon in origins], args.clicks)
+
+    cur.close()
+    conn.close()
+
+if __name__ == "__main__":
+    main()
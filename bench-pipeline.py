@@ -0,0 +1,305 @@
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import argparse
+import statistics
+import subprocess
+from urllib.parse import quote
+import psycopg2
+from dotenv import load_dotenv
+from stub_servers import GraphQLStub, LLMStub, GeocodeStub, serve
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BENCH_SCHEMA = "bench"
+PHASES = ("scrape", "import", "enrich")
+
+# The tables as they exist in Supabase before the migrations in sql/ are applied.
+BASE_SCHEMA = """
+    CREATE EXTENSION IF NOT EXISTS postgis SCHEMA public;
+    CREATE TABLE authors (
+        id text PRIMARY KEY,
+        title text,
+        url text,
+        birth_year text,
+        death_year text,
+        bio_foundation text,
+        bio_gale text,
+        bio_poetry text,
+        bio_pol text
+    );
+    CREATE TABLE poems (
+        id text PRIMARY KEY,
+        title text,
+        url text,
+        body text,
+        author_id text REFERENCES authors (id),
+        audio_url text
+    );
+    CREATE TABLE locations (
+        id serial PRIMARY KEY,
+        location_description text UNIQUE NOT NULL,
+        geom geography(Point, 4326)
+    );
+    CREATE TABLE poem_locations (
+        poem_id text REFERENCES poems (id) ON DELETE CASCADE,
+        location_id integer REFERENCES locations (id) ON DELETE CASCADE,
+        PRIMARY KEY (poem_id, location_id)
+    );
+    CREATE TABLE author_locations (
+        author_id text REFERENCES authors (id) ON DELETE CASCADE,
+        location_id integer REFERENCES locations (id) ON DELETE CASCADE,
+        PRIMARY KEY (author_id, location_id)
+    );
+"""
+
+# --- Database Connection ---
+def bench_db_url():
+    # Everything happens in its own schema, so the scripts' unqualified table names resolve there.
+    load_dotenv()
+    conn_str = os.environ.get("BENCH_DB_URL")
+    if not conn_str:
+        raise Exception("BENCH_DB_URL not set (a scratch PostgreSQL/PostGIS database).")
+    if conn_str == os.environ.get("SUPABASE_DB_URL"):
+        raise Exception("BENCH_DB_URL must not be the production database.")
+    separator = "&" if "?" in conn_str else "?"
+    return f"{conn_str}{separator}options={quote(f'-csearch_path={BENCH_SCHEMA},public')}"
+
+def connect_db():
+    return psycopg2.connect(bench_db_url())
+
+def create_schema(conn):
+    """Recreate the bench schema with the base tables and every migration in sql/."""
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE; CREATE SCHEMA {BENCH_SCHEMA};")
+        cur.execute(BASE_SCHEMA)
+        for path in sorted(glob.glob(os.path.join(SCRIPT_DIR, "sql", "*.sql"))):
+            with open(path, encoding="utf-8") as f:
+                cur.execute(f.read())
+    conn.commit()
+
+def reset_enrichment(conn):
+    # Lets the enrich phase be rerun on an imported corpus, e.g. to compare options.
+    with conn.cursor() as cur:
+        cur.execute("""
+            TRUNCATE poem_locations, author_locations, locations;
+            UPDATE poems SET enrich_status = 'pending', enrich_attempts = 0, enrich_worker = NULL,
+                             enrich_lease_until = NULL, enrich_error = NULL, enrich_method = NULL;
+            UPDATE authors SET enrich_status = 'pending', enrich_attempts = 0, enrich_worker = NULL,
+                               enrich_lease_until = NULL, enrich_error = NULL, enrich_method = NULL;
+        """)
+    conn.commit()
+
+# --- Running the scripts ---
+def run_script(work_dir, env, name, *args):
+    """Run one of the repo's scripts in `work_dir`; returns its wall-clock seconds. Output goes to logs/."""
+    log_path = os.path.join(work_dir, "logs", name.replace(".py", ".log"))
+    start = time.perf_counter()
+    with open(log_path, "a", encoding="utf-8") as log:
+        result = subprocess.run([sys.executable, os.path.join(SCRIPT_DIR, name), *args],
+                                cwd=work_dir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    if result.returncode != 0:
+        sys.exit(f"{name} failed (exit {result.returncode}); see {log_path}.")
+    return time.perf_counter() - start
+
+def metrics_args(step):
+    return ["--log-level", "error", "--metrics-events", os.path.join("events", f"{step}.jsonl")]
+
+def read_events(work_dir, step, event):
+    path = os.path.join(work_dir, "events", f"{step}.jsonl")
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [e for e in map(json.loads, f) if event is None or e["event"] == event]
+
+# --- Measurements ---
+def percentiles(samples):
+    if not samples:
+        return None, None
+    samples = sorted(samples)
+    return statistics.median(samples) * 1000, samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000
+
+def result(name, records, seconds, round_trips, latencies, unit):
+    p50, p99 = percentiles(latencies)
+    return {
+        "name": name,
+        "records": records,
+        "seconds": round(seconds, 3),
+        "records_per_second": round(records / max(seconds, 1e-9), 1),
+        "round_trips": round_trips,
+        "round_trips_per_record": round(round_trips / max(records, 1), 2),
+        "p50_ms": p50 and round(p50, 2),
+        "p99_ms": p99 and round(p99, 2),
+        "latency_of": unit,
+    }
+
+def bench_scrape(work_dir, env, args):
+    stub = GraphQLStub(count=args.entries, places=args.places,
+                       latency=args.graphql_latency, error_rate=args.graphql_error_rate)
+    server = serve(stub)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/"
+    results = []
+    for kind in ("authors", "poems"):
+        shutil.rmtree(os.path.join(work_dir, kind), ignore_errors=True)
+        requests_before = stub.requests
+        seconds = run_script(work_dir, env, "poetryfoundation-scrape.py", kind,
+                             "--output-dir", kind, "--base-url", base_url, "--limit", str(args.page_size))
+        results.append(result(f"scrape {kind}", args.entries, seconds, stub.requests - requests_before, [], "-"))
+    server.shutdown()
+    return results
+
+def bench_import(work_dir, env, args):
+    conn = connect_db()
+    create_schema(conn)
+    conn.close()
+    options = ["--workers", str(args.import_workers)] + ["--bulk"] * args.bulk
+    results = []
+    for kind in ("authors", "poems"):
+        step = f"import-{kind}"
+        # Authors were just imported; keep the poem step's numbers to poems.
+        skip = ["--skip-authors"] if kind == "poems" else []
+        seconds = run_script(work_dir, env, f"supabase-import-{kind}.py", *options, *skip, *metrics_args(step))
+        files = read_events(work_dir, step, "import_file")
+        results.append(result(f"import {kind}", sum(e["rows"] for e in files), seconds,
+                              sum(e["db_round_trips"] for e in files), [e["seconds"] for e in files], "file"))
+    return results
+
+def bench_enrich(work_dir, env, args):
+    conn = connect_db()
+    reset_enrichment(conn)
+    conn.close()
+    llm = LLMStub(latency=args.llm_latency, error_rate=args.llm_error_rate)
+    geocoder = GeocodeStub(latency=args.geocode_latency, error_rate=args.geocode_error_rate)
+    llm_server, geocode_server = serve(llm), serve(geocoder)
+    env = dict(env,
+               GENAI_BASE_URL=f"http://127.0.0.1:{llm_server.server_address[1]}/",
+               GEOCODE_ENDPOINT=f"http://127.0.0.1:{geocode_server.server_address[1]}/maps/api/geocode/json")
+    options = ["--sources", "authors,poems", "--batch-size", str(args.batch_size),
+               "--llm-workers", str(args.llm_workers), "--geocode-workers", str(args.geocode_workers),
+               "--llm-rate", str(args.llm_rate), "--geocode-rate", str(args.geocode_rate)]
+    run_script(work_dir, env, "enrich-locations.py", *options, *metrics_args("enrich"))
+    llm_server.shutdown()
+    geocode_server.shutdown()
+
+    # Sources run one after another, each ending with an enrichment_run event,
+    # so model requests and geocodes belong to the run that follows them.
+    runs = []
+    pending = {"llm_request": [], "geocode": [], "entity": []}
+    for event in read_events(work_dir, "enrich", None):
+        if event["event"] == "enrichment_run":
+            runs.append((event, pending))
+            pending = {"llm_request": [], "geocode": [], "entity": []}
+        elif event["event"] in pending:
+            pending[event["event"]].append(event)
+    results = []
+    for run, events in runs:
+        name, seconds = run["source"], run["seconds"]
+        entities, requests, geocodes = events["entity"], events["llm_request"], events["geocode"]
+        results.append(result(f"enrich {name}", run["entities"], seconds, run["db_round_trips"],
+                              [e["seconds"] for e in entities], "entity"))
+        results.append(result(f"  {name} model", len(requests), seconds, len(requests),
+                              [e["seconds"] for e in requests], "request"))
+        # Only geocodes answered by the API are round trips; the rest came from a cache.
+        results.append(result(f"  {name} geocode", len(geocodes), seconds, sum(e["source"] == "api" for e in geocodes),
+                              [e["seconds"] for e in geocodes], "lookup"))
+    return results
+
+# --- Report ---
+def print_report(results, baseline=None):
+    previous = {r["name"]: r for r in (baseline or [])}
+    print(f"{'step':<18} {'records':>8} {'seconds':>8} {'rec/s':>9} {'trips':>8} {'trips/rec':>9} "
+          f"{'p50 ms':>8} {'p99 ms':>8}  latency of")
+    for r in results:
+        p50 = "-" if r["p50_ms"] is None else f"{r['p50_ms']:.1f}"
+        p99 = "-" if r["p99_ms"] is None else f"{r['p99_ms']:.1f}"
+        line = (f"{r['name']:<18} {r['records']:>8} {r['seconds']:>8.1f} {r['records_per_second']:>9.1f} "
+                f"{r['round_trips']:>8} {r['round_trips_per_record']:>9.2f} {p50:>8} {p99:>8}  {r['latency_of']}")
+        old = previous.get(r["name"])
+        if old and old["records_per_second"]:
+            line += f"  ({(r['records_per_second'] / old['records_per_second'] - 1) * 100:+.0f}% rec/s)"
+        print(line)
+
+def regressions(results, baseline, tolerance):
+    """Steps whose records/s fell more than `tolerance` below the baseline run."""
+    previous = {r["name"]: r for r in baseline}
+    return [r["name"].strip() for r in results
+            if r["name"] in previous and not r["name"].startswith(" ")
+            and r["records_per_second"] < previous[r["name"]]["records_per_second"] * (1 - tolerance)]
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the scrape, import and enrichment scripts on a synthetic corpus, "
+                    "against a scratch database and local stand-ins for every external service.")
+    parser.add_argument("--phases", default=",".join(PHASES),
+                        help="Comma-separated subset of scrape,import,enrich. Later phases reuse earlier output.")
+    parser.add_argument("--work-dir", default="bench-work", help="Page files, caches, events and logs go here.")
+    parser.add_argument("--entries", type=int, default=2000, help="Synthetic authors, and as many poems.")
+    parser.add_argument("--places", type=int, default=200, help="Distinct places mentioned across the corpus.")
+    parser.add_argument("--page-size", type=int, default=500, help="Entries per scraped page file.")
+    parser.add_argument("--graphql-latency", type=float, default=0.05, help="Seconds per GraphQL request.")
+    parser.add_argument("--graphql-error-rate", type=float, default=0.0, help="Fraction of GraphQL requests answered 503.")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Seconds per model request.")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Fraction of model requests answered 429.")
+    parser.add_argument("--geocode-latency", type=float, default=0.05, help="Seconds per geocoding request.")
+    parser.add_argument("--geocode-error-rate", type=float, default=0.0,
+                        help="Fraction of geocoding requests answered OVER_QUERY_LIMIT.")
+    parser.add_argument("--bulk", action="store_true", help="Import with --bulk.")
+    parser.add_argument("--import-workers", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--llm-workers", type=int, default=4)
+    parser.add_argument("--geocode-workers", type=int, default=8)
+    parser.add_argument("--llm-rate", type=float, default=100.0)
+    parser.add_argument("--geocode-rate", type=float, default=500.0)
+    parser.add_argument("--keep-caches", action="store_true",
+                        help="Reuse the LLM and geocode caches of the previous run instead of starting cold.")
+    parser.add_argument("--gazetteer", help="Gazetteer index to geocode with (default: none, every place goes to the stub).")
+    parser.add_argument("--save", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="With --baseline, exit non-zero when a step's records/s drops by more than this fraction.")
+    args = parser.parse_args()
+
+    phases = [p for p in args.phases.split(",") if p]
+    if any(p not in PHASES for p in phases):
+        parser.error(f"--phases takes a subset of {','.join(PHASES)}")
+    work_dir = os.path.abspath(args.work_dir)
+    for sub in ("events", "logs"):
+        shutil.rmtree(os.path.join(work_dir, sub), ignore_errors=True)
+        os.makedirs(os.path.join(work_dir, sub))
+    if not args.keep_caches:
+        shutil.rmtree(os.path.join(work_dir, "cache"), ignore_errors=True)
+
+    env = dict(
+        os.environ,
+        SUPABASE_DB_URL=bench_db_url(),
+        GOOGLE_API_KEY="bench",
+        LLM_CACHE_PATH=os.path.join(work_dir, "cache", "llm.sqlite"),
+        GEOCODE_CACHE_PATH=os.path.join(work_dir, "cache", "geocode.sqlite"),
+        GAZETTEER_PATH=os.path.abspath(args.gazetteer) if args.gazetteer else os.path.join(work_dir, "no-gazetteer.sqlite"),
+        GEOCODE_OFFLINE="0",
+    )
+    results = []
+    if "scrape" in phases:
+        results += bench_scrape(work_dir, env, args)
+    if "import" in phases:
+        results += bench_import(work_dir, env, args)
+    if "enrich" in phases:
+        results += bench_enrich(work_dir, env, args)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    print_report(results, baseline)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+    if baseline:
+        slower = regressions(results, baseline, args.tolerance)
+        if slower:
+            sys.exit(f"Slower than the baseline by more than {args.tolerance:.0%}: {', '.join(slower)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+import argparse
+import time
+from gazetteer import DEFAULT_GAZETTEER_PATH, build_index
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the offline gazetteer index from GeoNames dumps.")
+    parser.add_argument("geonames", help="GeoNames table dump, e.g. allCountries.txt or cities500.txt")
+    parser.add_argument("--admin1", default="admin1CodesASCII.txt", help="GeoNames admin1CodesASCII.txt")
+    parser.add_argument("--country-info", default="countryInfo.txt", help="GeoNames countryInfo.txt")
+    parser.add_argument("--output", default=DEFAULT_GAZETTEER_PATH, help="Index file to write")
+    parser.add_argument("--feature-classes", default="PAHTL",
+                        help="GeoNames feature classes to keep (P populated places, A regions, H water, T terrain, L parks/areas)")
+    parser.add_argument("--min-population", type=int, default=0,
+                        help="Skip populated places smaller than this")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    count = build_index(args.geonames, args.admin1, args.country_info, args.output,
+                        feature_classes=args.feature_classes, min_population=args.min_population)
+    print(f"Indexed {count} places into {args.output} in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
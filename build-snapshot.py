@@ -0,0 +1,27 @@
+import time
+import argparse
+from snapshot import KINDS, Snapshot, build_snapshot, page_files
+
+def main():
+    parser = argparse.ArgumentParser(description="Flatten scraped page files into a memory-mappable columnar snapshot.")
+    parser.add_argument("kind", choices=sorted(KINDS))
+    parser.add_argument("--dir", help="Page directory; defaults to the kind name (authors/ or poems/).")
+    parser.add_argument("--output", help="Snapshot file; defaults to <dir>/snapshot.bin.")
+    args = parser.parse_args()
+
+    directory = args.dir or args.kind
+    files = page_files(directory)
+    if not files:
+        print(f"No page files found in '{directory}'.")
+        return
+    start = time.perf_counter()
+    count, path = build_snapshot(directory, args.kind, args.output)
+    elapsed = time.perf_counter() - start
+    snapshot = Snapshot(path)
+    types = ", ".join(f"{name} ({column['type']})" for name, column in snapshot.footer["columns"].items())
+    snapshot.close()
+    print(f"Wrote {count} {args.kind} from {len(files)} page files to {path} in {elapsed:.2f}s.")
+    print(f"Columns: {types}")
+
+if __name__ == "__main__":
+    main()
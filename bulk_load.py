@@ -0,0 +1,107 @@
+# --- COPY text format encoding ---
+def copy_value(value):
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+def copy_line(row, columns):
+    return "\t".join(copy_value(row.get(col)) for col in columns) + "\n"
+
+class CopyStream:
+    """
+    File-like object that renders rows into COPY lines as psycopg2 reads from it,
+    so a file is streamed to the server without being buffered in full.
+    """
+    def __init__(self, rows, columns):
+        self.lines = (copy_line(row, columns) for row in rows)
+        self.buf = ""
+        self.count = 0
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buf) < size:
+            line = next(self.lines, None)
+            if line is None:
+                break
+            self.buf += line
+            self.count += 1
+        if size < 0:
+            out, self.buf = self.buf, ""
+        else:
+            out, self.buf = self.buf[:size], self.buf[size:]
+        return out
+
+# --- Staging ---
+def stage_table(table):
+    return f"{table}_stage"
+
+def create_stage(cur, table, columns):
+    """
+    Create a session-local staging table with the same column types as `table`,
+    plus `stage_ord`, which numbers rows in the order they were copied in.
+    Rows are cleared on every commit, so one staging table serves every file.
+    """
+    cols = ", ".join(columns)
+    cur.execute(f"""
+        CREATE TEMP TABLE IF NOT EXISTS {stage_table(table)}
+        ON COMMIT DELETE ROWS
+        AS SELECT {cols} FROM {table} WITH NO DATA;
+        ALTER TABLE {stage_table(table)} ADD COLUMN IF NOT EXISTS stage_ord bigserial;
+    """)
+
+def stage_rows(cur, table, columns, rows):
+    """
+    COPY `rows` (dicts keyed by column name) into the staging table for `table`.
+    Returns the number of rows staged.
+    """
+    stream = CopyStream(rows, columns)
+    cols = ", ".join(columns)
+    cur.copy_expert(f"COPY {stage_table(table)} ({cols}) FROM STDIN", stream)
+    return stream.count
+
+def merge_staged(cur, table, columns, links_table, link_column):
+    """
+    Move staged rows into `table` with one set-based upsert. Rows whose
+    content_hash is unchanged are left alone; rows that changed lose their
+    `links_table` rows and go back on the enrichment queue. When an id was
+    staged more than once, its last row wins, as with per-row upserts.
+    Returns (inserted, updated, requeued) counts.
+    """
+    cols = ", ".join(columns)
+    updates = ", ".join(f"{col} = EXCLUDED.{col}" for col in columns if col != "id")
+    stage = stage_table(table)
+    cur.execute(f"""
+        WITH old AS (
+            SELECT id, content_hash FROM {table}
+            WHERE id IN (SELECT id FROM {stage})
+        ), upserted AS (
+            INSERT INTO {table} ({cols})
+            SELECT DISTINCT ON (id) {cols}
+            FROM {stage}
+            ORDER BY id, stage_ord DESC
+            ON CONFLICT (id) DO UPDATE SET {updates},
+                -- Rows imported before hashing existed only get their hash backfilled.
+                enrich_status = CASE WHEN {table}.content_hash IS NULL
+                                     THEN {table}.enrich_status ELSE 'pending' END,
+                enrich_attempts = CASE WHEN {table}.content_hash IS NULL
+                                       THEN {table}.enrich_attempts ELSE 0 END
+            WHERE {table}.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+            RETURNING id
+        ), requeued AS (
+            SELECT u.id FROM upserted u JOIN old o ON o.id = u.id
+            WHERE o.content_hash IS NOT NULL
+        ), unlinked AS (
+            DELETE FROM {links_table}
+            WHERE {link_column} IN (SELECT id FROM requeued)
+        )
+        SELECT
+            (SELECT count(*) FROM upserted WHERE id NOT IN (SELECT id FROM old)),
+            (SELECT count(*) FROM upserted WHERE id IN (SELECT id FROM old)),
+            (SELECT count(*) FROM requeued);
+    """)
+    return cur.fetchone()
@@ -0,0 +1,98 @@
+import math
+from tiles import content_digest
+
+TILE_SIZE = 256
+DEFAULT_MAX_ZOOM = 10
+DEFAULT_CELL_PIXELS = 64
+
+def mercator(lat, lon):
+    """Web Mercator position of a point as fractions of the world, (0, 0) at the top left."""
+    sin_lat = min(max(math.sin(math.radians(lat)), -0.9999), 0.9999)
+    x = (lon + 180.0) / 360.0
+    y = 0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+    return min(max(x, 0.0), 1 - 1e-12), min(max(y, 0.0), 1 - 1e-12)
+
+def build_levels(points, max_zoom=DEFAULT_MAX_ZOOM, cell_pixels=DEFAULT_CELL_PIXELS):
+    """
+    Cluster (location id, lat, lon, poems, description) points per zoom level.
+
+    At each zoom the world is cut into square cells of `cell_pixels` screen
+    pixels and every non-empty cell becomes one cluster. Cell sizes are powers
+    of two, so each cell is exactly four cells of the next zoom and the levels
+    form a quadtree: a location added later changes only the cells on its own
+    path, never how its neighbours are grouped. Returns {zoom: {(cx, cy): cluster}}.
+    """
+    cells_per_tile = TILE_SIZE // cell_pixels
+    side = 2 ** max_zoom * cells_per_tile
+    level = {}
+    for location_id, lat, lon, poems, description in points:
+        x, y = mercator(lat, lon)
+        key = (int(x * side), int(y * side))
+        cluster = level.setdefault(key, {
+            "lat_sum": 0.0, "lon_sum": 0.0, "locations": 0, "poems": 0,
+            "description": None, "zoom": None,
+        })
+        cluster["lat_sum"] += lat
+        cluster["lon_sum"] += lon
+        cluster["locations"] += 1
+        cluster["poems"] += poems
+        cluster["description"] = description if cluster["locations"] == 1 else None
+    levels = {max_zoom: level}
+    for zoom in range(max_zoom - 1, -1, -1):
+        parents = {}
+        children = {}
+        for (cx, cy), child in levels[zoom + 1].items():
+            key = (cx >> 1, cy >> 1)
+            children.setdefault(key, []).append(child)
+        for key, group in children.items():
+            parents[key] = {
+                "lat_sum": sum(c["lat_sum"] for c in group),
+                "lon_sum": sum(c["lon_sum"] for c in group),
+                "locations": sum(c["locations"] for c in group),
+                "poems": sum(c["poems"] for c in group),
+                "description": group[0]["description"] if len(group) == 1 else None,
+                # The zoom at which clicking this cluster shows it split up.
+                "zoom": zoom + 1 if len(group) > 1 else group[0]["zoom"],
+            }
+        levels[zoom] = parents
+    return levels
+
+def cluster_record(cluster):
+    record = {
+        "lat": round(cluster["lat_sum"] / cluster["locations"], 5),
+        "lon": round(cluster["lon_sum"] / cluster["locations"], 5),
+        "poems": cluster["poems"],
+        "locations": cluster["locations"],
+    }
+    if cluster["zoom"] is not None:
+        record["zoom"] = cluster["zoom"]
+    if cluster["description"] is not None:
+        record["description"] = cluster["description"]
+    return record
+
+def tile_files(levels, cell_pixels=DEFAULT_CELL_PIXELS):
+    """
+    Group clusters into {"<z>/<x>/<y>.json": {"clusters", "children"}} tile files.
+    `children` maps each non-empty tile of the next zoom to its content digest,
+    so clients only request tiles that exist and see when one has changed.
+    """
+    cells_per_tile = TILE_SIZE // cell_pixels
+    max_zoom = max(levels)
+    files = {}
+    digests = {}
+    for zoom in range(max_zoom, -1, -1):
+        tiles = {}
+        for (cx, cy), cluster in sorted(levels[zoom].items()):
+            tiles.setdefault((cx // cells_per_tile, cy // cells_per_tile), []).append(cluster_record(cluster))
+        for (x, y), records in tiles.items():
+            children = {}
+            if zoom < max_zoom:
+                for child_x in (2 * x, 2 * x + 1):
+                    for child_y in (2 * y, 2 * y + 1):
+                        digest = digests.get((zoom + 1, child_x, child_y))
+                        if digest is not None:
+                            children[f"{child_x}/{child_y}"] = digest
+            data = {"clusters": records, "children": children}
+            digests[(zoom, x, y)] = content_digest(data)
+            files[f"{zoom}/{x}/{y}.json"] = data
+    return files, digests.get((0, 0, 0))
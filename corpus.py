@@ -0,0 +1,194 @@
+import os
+import gzip
+import json
+import hashlib
+
+# Columns written to the authors/poems tables, in COPY/INSERT order.
+AUTHOR_COLUMNS = (
+    "id",
+    "title",
+    "url",
+    "birth_year",
+    "death_year",
+    "bio_foundation",
+    "bio_gale",
+    "bio_poetry",
+    "bio_pol",
+    "content_hash",
+)
+POEM_COLUMNS = (
+    "id",
+    "title",
+    "url",
+    "body",
+    "author_id",
+    "audio_url",
+    "content_hash",
+)
+
+def content_hash(row):
+    # Stable digest of every imported column except the id.
+    content = [row[key] for key in sorted(row) if key not in ("id", "content_hash")]
+    return hashlib.sha256(json.dumps(content, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def author_row(author):
+    # Map JSON field names to our table's columns.
+    row = {
+        "id": author.get("id"),
+        "title": author.get("title"),
+        "url": author.get("url"),
+        "birth_year": author.get("birthYear"),
+        "death_year": author.get("deathYear"),
+        "bio_foundation": author.get("foundationBio"),
+        "bio_gale": author.get("galeBio"),
+        "bio_poetry": author.get("poetryBio"),
+        "bio_pol": author.get("polBio")
+    }
+    row["content_hash"] = content_hash(row)
+    return row
+
+def poem_row(poem):
+    # Extract the primary author id (if available).
+    author_id = None
+    if poem.get("authors") and len(poem["authors"]) > 0:
+        author_id = poem["authors"][0].get("id")
+
+    # Extract the audio URL from the audioVersion field.
+    audio_url = None
+    if poem.get("audioVersion") and len(poem["audioVersion"]) > 0:
+        av = poem["audioVersion"][0]
+        if av.get("audioFile") and len(av["audioFile"]) > 0:
+            audio_url = av["audioFile"][0].get("url")
+
+    row = {
+        "id": poem.get("id"),
+        "title": poem.get("title"),
+        "url": poem.get("url"),
+        "body": poem.get("body"),
+        "author_id": author_id,
+        "audio_url": audio_url
+    }
+    row["content_hash"] = content_hash(row)
+    return row
+
+# --- Streaming page reader ---
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+class _PageReader:
+    """
+    Incremental reader over a GraphQL page file. Only the value currently being
+    decoded (one entry) plus one read chunk is ever held in memory.
+    """
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, min_size):
+        # Drop consumed text, then read until `min_size` unread characters are buffered.
+        if self.pos:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        while not self.eof and len(self.buf) < min_size:
+            chunk = self.f.read(max(self.chunk_size, min_size - len(self.buf)))
+            if not chunk:
+                self.eof = True
+            self.buf += chunk
+
+    def next_char(self):
+        # Return the next non-whitespace character without consuming it ("" at EOF).
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof:
+                return ""
+            self.fill(1)
+
+    def expect(self, char):
+        if self.next_char() != char:
+            raise ValueError(f"Expected '{char}' at offset {self.pos} of page file")
+        self.pos += 1
+
+    def decode_value(self):
+        self.next_char()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self.fill(2 * (len(self.buf) - self.pos) + self.chunk_size)
+                continue
+            # A number ending exactly at the buffer edge may continue in the next chunk.
+            if end == len(self.buf) and not self.eof:
+                self.fill(len(self.buf) - self.pos + self.chunk_size)
+                continue
+            self.pos = end
+            return value
+
+    def object_keys(self):
+        # Yield each key of the object at the cursor, leaving the cursor on its value.
+        self.expect("{")
+        if self.next_char() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.decode_value()
+            self.expect(":")
+            yield key
+            char = self.next_char()
+            self.pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                raise ValueError(f"Malformed object at offset {self.pos} of page file")
+
+    def array_items(self):
+        self.expect("[")
+        if self.next_char() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.decode_value()
+            char = self.next_char()
+            self.pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError(f"Malformed array at offset {self.pos} of page file")
+
+def open_page(filepath):
+    # The Python scraper writes gzip-compressed pages; older curl pages are plain JSON.
+    if filepath.endswith(".gz"):
+        return gzip.open(filepath, "rt", encoding="utf-8")
+    return open(filepath, "r", encoding="utf-8")
+
+def iter_entries(filepath, chunk_size=64 * 1024):
+    """
+    Yield the entries of a scraped page file (`data.entries`) one at a time,
+    so memory stays flat regardless of how many entries a page holds.
+    """
+    with open_page(filepath) as f:
+        reader = _PageReader(f, chunk_size)
+        for key in reader.object_keys():
+            if key != "data" or reader.next_char() != "{":
+                reader.decode_value()
+                continue
+            for data_key in reader.object_keys():
+                if data_key != "entries" or reader.next_char() != "[":
+                    reader.decode_value()
+                    continue
+                yield from reader.array_items()
+                return
+            return
+
+def archive_delta(filepath):
+    # Move an imported delta page into delta/imported/ so the next --delta run skips it.
+    imported_dir = os.path.join(os.path.dirname(filepath), "imported")
+    os.makedirs(imported_dir, exist_ok=True)
+    os.replace(filepath, os.path.join(imported_dir, os.path.basename(filepath)))
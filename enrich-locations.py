@@ -0,0 +1,4 @@
+from location_enrichment import main
+
+if __name__ == "__main__":
+    main()
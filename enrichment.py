@@ -0,0 +1,284 @@
+import time
+import queue
+import random
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from metrics import ERROR, default_metrics
+
+class QuotaError(Exception):
+    """Raised by a backend when the remote API reports a rate or quota limit."""
+
+def is_quota_error(e):
+    # google-genai raises APIError subclasses carrying the HTTP status in `code`.
+    return isinstance(e, QuotaError) or getattr(e, "code", None) == 429
+
+# --- Rate limiting ---
+class TokenBucket:
+    """
+    Thread-safe token bucket allowing `rate` calls per second with bursts of
+    `burst`. After a quota error `penalize` halves the rate; each success lets
+    it climb back toward the configured rate.
+    """
+    def __init__(self, rate, burst=None):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def penalize(self):
+        with self.lock:
+            self.rate = max(self.max_rate / 64, self.rate / 2)
+
+    def reward(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+def call_with_backoff(fn, limiter, *args, attempts=6, base_delay=1.0, stage="other"):
+    """
+    Call fn(*args) under `limiter`, retrying quota errors with jittered exponential backoff.
+    Time spent waiting for the limiter and retries are recorded under `stage`.
+    """
+    metrics = default_metrics()
+    for attempt in range(attempts):
+        waited = time.perf_counter()
+        limiter.acquire()
+        metrics.observe("rate_limit_wait_seconds", time.perf_counter() - waited, stage=stage)
+        try:
+            result = fn(*args)
+        except Exception as e:
+            if not is_quota_error(e) or attempt == attempts - 1:
+                raise
+            metrics.count("quota_retries_total", stage=stage)
+            limiter.penalize()
+            time.sleep(base_delay * 2 ** attempt * random.uniform(0.5, 1.5))
+            continue
+        limiter.reward()
+        return result
+
+# --- Pipeline ---
+class EnrichmentPipeline:
+    """
+    Runs location extraction and geocoding for many entities concurrently.
+
+    `extract(title, text, call)` returns a list of location descriptions and
+    `geocode(description)` returns (lat, lon) or raises. Each runs on its own
+    thread pool under its own rate limit. `extract` makes its model request as
+    `call(fn, *args)`, which applies the rate limit and quota retries, so
+    anything it does before or after (such as a cache lookup) runs once.
+    Results are handed back to the thread that called `run`, so all database
+    writes stay on one connection.
+
+    With `extract_batch(items, call)` and a `batch_size` above 1, up to `batch_size`
+    entities share one model request; entities missing from its
+    {key: descriptions} answer fall back to `extract`.
+
+    `prefilter(title, text)`, when given, runs first on the calling thread; a
+    list it returns is used as the entity's descriptions and no model request
+    is made. Returning None sends the entity to the model as usual.
+
+    `canonicalize(description)`, when given, maps each extracted description to
+    the stored spelling of the same place before anything is geocoded.
+
+    `source` names the kind of entity (e.g. "poems") in the log and labels its metrics.
+    """
+    def __init__(self, extract, geocode, llm_limiter, geocode_limiter, known_locations,
+                 llm_workers=4, geocode_workers=8, extract_batch=None, batch_size=1, prefilter=None, canonicalize=None,
+                 source="entities"):
+        self.extract = extract
+        self.prefilter = prefilter
+        # Keys the prefilter answered without a model request.
+        self.prefiltered = set()
+        self.canonicalize = canonicalize
+        self.extract_batch = extract_batch
+        self.batch_size = batch_size if extract_batch else 1
+        self.geocode = geocode
+        self.llm_limiter = llm_limiter
+        self.geocode_limiter = geocode_limiter
+        # Descriptions already stored in `locations`; these are never geocoded again.
+        self.known_locations = known_locations
+        self.llm_workers = llm_workers
+        self.geocode_workers = geocode_workers
+        self.max_in_flight = llm_workers * self.batch_size * 2
+        self.results = queue.Queue()
+        # description -> future of its lookup, for every place geocoded in this run
+        self.geocoding = {}
+        self.geocoding_lock = threading.Lock()
+        self.source = source
+        self.metrics = default_metrics()
+
+    def _geocode(self, description):
+        try:
+            return call_with_backoff(self.geocode, self.geocode_limiter, description, stage="geocode")
+        except Exception as e:
+            self.metrics.log(f"Geocoding failed for '{description}': {e}", ERROR)
+            return None
+
+    def _call_llm(self, fn, *args):
+        return call_with_backoff(fn, self.llm_limiter, *args, stage="llm")
+
+    def _extract(self, key, title, text):
+        try:
+            descriptions = self.extract(title, text, self._call_llm)
+        except Exception as e:
+            self.results.put((key, None, e))
+            return
+        self._resolve(key, descriptions)
+
+    def _extract_batch(self, items):
+        try:
+            results = self.extract_batch(items, self._call_llm)
+        except Exception as e:
+            self.metrics.log(f"Batched extraction failed, falling back to single requests: {e}", ERROR)
+            results = {}
+        for key, title, text in items:
+            if key in results:
+                self._resolve(key, results[key])
+            else:
+                self._extract(key, title, text)
+
+    def _resolve(self, key, descriptions):
+        # Every entity must put exactly one result, or run() waits for it forever.
+        try:
+            if self.canonicalize:
+                descriptions = list(dict.fromkeys(self.canonicalize(desc) for desc in descriptions))
+            lookups = [
+                desc for desc in dict.fromkeys(descriptions)
+                if desc != "N/A" and desc not in self.known_locations
+            ]
+        except Exception as e:
+            self.results.put((key, None, e))
+            return
+        if not lookups:
+            self.results.put((key, [(desc, None) for desc in descriptions], None))
+            return
+
+        # Hand the lookups to the geocoding pool and free this LLM worker;
+        # the last lookup to finish reports the entity's result.
+        coords = {}
+        remaining = [len(lookups)]
+        lock = threading.Lock()
+
+        def done(desc, future):
+            coords[desc] = future.result()
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self.results.put((key, [(d, coords.get(d)) for d in descriptions], None))
+
+        for desc in lookups:
+            # Entities naming the same new place share one lookup.
+            with self.geocoding_lock:
+                future = self.geocoding.get(desc)
+                if future is None:
+                    future = self.geocoding[desc] = self.geocode_pool.submit(self._geocode, desc)
+            future.add_done_callback(partial(done, desc))
+
+    def _apply_prefilter(self, batch):
+        remaining = []
+        for key, title, text in batch:
+            try:
+                descriptions = self.prefilter(title, text)
+            except Exception as e:
+                self.results.put((key, None, e))
+                continue
+            if descriptions is None:
+                remaining.append((key, title, text))
+            else:
+                self.prefiltered.add(key)
+                self._resolve(key, descriptions)
+        return remaining
+
+    def _record_entity(self, key, resolved, error, seconds, round_trips):
+        if error is not None:
+            outcome = "extract_error"
+        elif not resolved or all(desc == "N/A" for desc, _ in resolved):
+            outcome = "no_locations"
+        else:
+            outcome = "located"
+        self.metrics.observe("entity_seconds", seconds, source=self.source)
+        self.metrics.count("entities_total", source=self.source, outcome=outcome)
+        self.metrics.event("entity", source=self.source, key=key, outcome=outcome, seconds=round(seconds, 4),
+                           locations=len(resolved or []), db_round_trips=round_trips)
+
+    def run(self, fetch, write):
+        """
+        `fetch(n)` returns up to n (key, title, text) tuples to work on.
+        `write(key, resolved, error)` receives a list of
+        (description, (lat, lon) or None) or the extraction error.
+        Returns the number of entities processed.
+
+        Each entity's time from claim to write, its outcome and the database
+        round trips its write took are recorded in the process metrics.
+        """
+        metrics = self.metrics
+        self.llm_pool = ThreadPoolExecutor(self.llm_workers, thread_name_prefix="llm")
+        self.geocode_pool = ThreadPoolExecutor(self.geocode_workers, thread_name_prefix="geocode")
+        in_flight = 0
+        exhausted = False
+        processed = 0
+        started = {}
+        # The metrics are per process, so this run's round trips are the difference.
+        stages = ("claim", "write")
+        round_trips_before = {stage: metrics.value("db_round_trips_total", stage=stage) for stage in stages}
+        start = time.monotonic()
+        try:
+            while True:
+                # Refill in batches once half the in-flight slots are free.
+                if not exhausted and in_flight <= self.max_in_flight // 2:
+                    with metrics.stage("claim"):
+                        batch = fetch(self.max_in_flight - in_flight)
+                    if not batch:
+                        exhausted = True
+                    in_flight += len(batch)
+                    claimed = time.perf_counter()
+                    for key, _, _ in batch:
+                        started[key] = claimed
+                    if self.prefilter:
+                        batch = self._apply_prefilter(batch)
+                    for i in range(0, len(batch), self.batch_size):
+                        group = batch[i:i + self.batch_size]
+                        if len(group) > 1:
+                            self.llm_pool.submit(self._extract_batch, group)
+                        else:
+                            self.llm_pool.submit(self._extract, *group[0])
+                if in_flight == 0:
+                    break
+                key, resolved, error = self.results.get()
+                in_flight -= 1
+                round_trips = metrics.value("db_round_trips_total", stage="write")
+                with metrics.stage("write"):
+                    write(key, resolved, error)
+                round_trips = metrics.value("db_round_trips_total", stage="write") - round_trips
+                processed += 1
+                self._record_entity(key, resolved, error, time.perf_counter() - started.pop(key), round_trips)
+                metrics.gauge("entities_per_minute", processed / max(time.monotonic() - start, 1e-9) * 60, source=self.source)
+        finally:
+            self.llm_pool.shutdown(wait=True, cancel_futures=True)
+            self.geocode_pool.shutdown(wait=True, cancel_futures=True)
+        elapsed = time.monotonic() - start
+        metrics.log(f"Processed {processed} {self.source} in {elapsed:.1f}s ({processed / max(elapsed, 1e-9) * 60:.1f}/min).", ERROR)
+        round_trips = {stage: metrics.value("db_round_trips_total", stage=stage) - round_trips_before[stage] for stage in stages}
+        metrics.event("enrichment_run", source=self.source, entities=processed, seconds=round(elapsed, 4),
+                      db_round_trips=sum(round_trips.values()), prefiltered=len(self.prefiltered))
+        if processed and any(round_trips.values()):
+            metrics.log("Database round trips per entity: " + ", ".join(
+                f"{stage} {count / processed:.1f}" for stage, count in round_trips.items()), ERROR)
+        if self.prefilter:
+            metrics.log(f"Prefilter answered {len(self.prefiltered)} of {processed} {self.source} without a model request.", ERROR)
+        return processed
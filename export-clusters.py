@@ -0,0 +1,78 @@
+import os
+import time
+import argparse
+from datetime import datetime, timezone
+import psycopg2
+from dotenv import load_dotenv
+from clusters import DEFAULT_CELL_PIXELS, DEFAULT_MAX_ZOOM, TILE_SIZE, build_levels, tile_files
+from tiles import load_index, sync_files, write_json_atomic
+
+# --- Database Connection ---
+def connect_db():
+    load_dotenv()
+    conn_str = os.environ.get("SUPABASE_DB_URL")
+    if not conn_str:
+         raise Exception("SUPABASE_DB_URL not set.")
+    return psycopg2.connect(conn_str)
+
+def fetch_points(conn):
+    """(location id, lat, lon, poems, description) for every location with a playable poem."""
+    cur = conn.cursor()
+    # Only poems with audio count, as those are the ones a click on the map can play.
+    cur.execute("""
+        SELECT l.id, ST_Y(l.geom::geometry), ST_X(l.geom::geometry),
+               COUNT(DISTINCT p.id), l.location_description
+        FROM locations l
+        JOIN poem_locations pl ON pl.location_id = l.id
+        JOIN poems p ON p.id = pl.poem_id
+        WHERE l.geom IS NOT NULL AND p.audio_url IS NOT NULL
+        GROUP BY l.id
+        ORDER BY l.id;
+    """)
+    points = cur.fetchall()
+    cur.close()
+    return points
+
+def main():
+    parser = argparse.ArgumentParser(description="Export per-zoom clusters of poem locations as static tiles for the map page.")
+    parser.add_argument("--output", default=os.path.join("docs", "clusters"), help="Directory to write cluster tiles to.")
+    parser.add_argument("--max-zoom", type=int, default=DEFAULT_MAX_ZOOM,
+                        help="Deepest zoom level to cluster; the map reuses it when zoomed in further.")
+    parser.add_argument("--cell-pixels", type=int, default=DEFAULT_CELL_PIXELS, choices=[16, 32, 64, 128],
+                        help="Cluster cell size in screen pixels; a tile holds at most (256 / size)^2 clusters.")
+    args = parser.parse_args()
+
+    start = time.monotonic()
+    conn = connect_db()
+    points = fetch_points(conn)
+    conn.close()
+
+    levels = build_levels(points, args.max_zoom, args.cell_pixels)
+    files, root = tile_files(levels, args.cell_pixels)
+
+    index_path = os.path.join(args.output, "index.json")
+    previous = load_index(index_path)
+    previous_digests = previous.get("tiles", {})
+    if (previous.get("max_zoom"), previous.get("cell_pixels")) != (args.max_zoom, args.cell_pixels):
+        # Different cells: nothing from the old layout can be kept.
+        previous_digests = dict.fromkeys(previous_digests)
+    digests, written, unchanged, deleted = sync_files(args.output, files, previous_digests)
+
+    # meta.json is all the map page loads up front; tiles are found through their parents.
+    meta = {"max_zoom": args.max_zoom, "cell_pixels": args.cell_pixels, "tile_size": TILE_SIZE, "root": root}
+    if written or deleted or previous.get("meta") != meta:
+        write_json_atomic(os.path.join(args.output, "meta.json"), meta)
+        write_json_atomic(index_path, {
+            "max_zoom": args.max_zoom,
+            "cell_pixels": args.cell_pixels,
+            "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "meta": meta,
+            "tiles": digests,
+        })
+    largest = max((len(data["clusters"]) for data in files.values()), default=0)
+    print(f"Clustered {len(points)} locations into {len(files)} tiles over zooms 0-{args.max_zoom} "
+          f"(at most {largest} clusters per tile) in {time.monotonic() - start:.1f}s: "
+          f"{written} written, {unchanged} unchanged, {deleted} deleted.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import os
+import time
+import argparse
+from datetime import datetime, timezone
+import psycopg2
+from dotenv import load_dotenv
+from tiles import geohash_encode, load_index, sync_files, write_json_atomic
+
+INDEX_VERSION = 1
+
+# --- Database Connection ---
+def connect_db():
+    load_dotenv()
+    conn_str = os.environ.get("SUPABASE_DB_URL")
+    if not conn_str:
+         raise Exception("SUPABASE_DB_URL not set.")
+    return psycopg2.connect(conn_str)
+
+def iter_poem_cards(conn):
+    """Yield one denormalized card per playable (poem, location) pair."""
+    # Server-side cursor: the corpus is streamed, not loaded in one result set.
+    cur = conn.cursor(name="export_poem_cards")
+    cur.itersize = 5000
+    cur.execute("""
+        SELECT p.id, p.title, p.url, p.body, p.audio_url,
+               a.title, a.url, a.birth_year, a.death_year,
+               l.location_description, ST_Y(l.geom::geometry), ST_X(l.geom::geometry)
+        FROM poems p
+        JOIN poem_locations pl ON pl.poem_id = p.id
+        JOIN locations l ON l.id = pl.location_id
+        LEFT JOIN authors a ON a.id = p.author_id
+        WHERE p.audio_url IS NOT NULL AND l.geom IS NOT NULL;
+    """)
+    for (poem_id, title, url, body, audio_url, author, author_url,
+         birth_year, death_year, location, lat, lon) in cur:
+        years = [str(y) for y in (birth_year, death_year) if y and str(y).lower() != "none"]
+        yield {
+            "id": poem_id,
+            "title": title,
+            "url": url,
+            "body": body,
+            "audio_url": audio_url,
+            "author": author,
+            "author_url": author_url,
+            "author_years": " - ".join(years),
+            "location_description": location,
+            "lat": round(lat, 5),
+            "lon": round(lon, 5),
+        }
+    cur.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Export poems as geohash-tiled static JSON for the map page.")
+    parser.add_argument("--output", default=os.path.join("docs", "tiles"), help="Directory to write tiles to.")
+    parser.add_argument("--precision", type=int, default=3,
+                        help="Geohash length of a tile (3 is about 156 x 156 km, 4 about 39 x 20 km).")
+    args = parser.parse_args()
+
+    start = time.monotonic()
+    conn = connect_db()
+    tiles = {}
+    cards = 0
+    for card in iter_poem_cards(conn):
+        tiles.setdefault(geohash_encode(card["lat"], card["lon"], args.precision), []).append(card)
+        cards += 1
+    conn.close()
+
+    files = {}
+    for geohash, tile_cards in tiles.items():
+        tile_cards.sort(key=lambda c: (str(c["id"]), c["location_description"] or ""))
+        files[f"{geohash}.json"] = {"geohash": geohash, "poems": tile_cards}
+
+    index_path = os.path.join(args.output, "index.json")
+    previous = load_index(index_path)
+    if previous.get("precision") != args.precision:
+        # A different tiling: every old tile goes.
+        previous_digests = {f"{gh}.json": None for gh in previous.get("tiles", {})}
+    else:
+        previous_digests = {f"{gh}.json": tile["hash"] for gh, tile in previous.get("tiles", {}).items()}
+    digests, written, unchanged, deleted = sync_files(args.output, files, previous_digests)
+
+    index = {
+        "version": INDEX_VERSION,
+        "precision": args.precision,
+        "tiles": {
+            name[:-len(".json")]: {"hash": digest, "count": len(files[name]["poems"])}
+            for name, digest in digests.items()
+        },
+    }
+    if index["tiles"] != previous.get("tiles") or written or deleted:
+        index["generated_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        write_json_atomic(index_path, index)
+    print(f"Exported {cards} poem cards into {len(files)} tiles in {time.monotonic() - start:.1f}s: "
+          f"{written} written, {unchanged} unchanged, {deleted} deleted.")
+
+if __name__ == "__main__":
+    main()
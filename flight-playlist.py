@@ -0,0 +1,156 @@
+import os
+import json
+import hashlib
+import argparse
+from datetime import datetime, timezone
+import psycopg2
+from dotenv import load_dotenv
+from route import Route, great_circle_points, load_airports, load_csv_track, load_gpx
+
+BUNDLE_VERSION = 1
+
+# --- Database Connection ---
+def connect_db():
+    load_dotenv()
+    conn_str = os.environ.get("SUPABASE_DB_URL")
+    if not conn_str:
+         raise Exception("SUPABASE_DB_URL not set.")
+    return psycopg2.connect(conn_str)
+
+def fetch_poem_points(cur):
+    """(poem id, location description, lat, lon) for every playable poem location."""
+    cur.execute("""
+        SELECT pl.poem_id, l.location_description,
+               ST_Y(l.geom::geometry), ST_X(l.geom::geometry)
+        FROM locations l
+        JOIN poem_locations pl ON pl.location_id = l.id
+        JOIN poems p ON p.id = pl.poem_id
+        WHERE l.geom IS NOT NULL AND p.audio_url IS NOT NULL;
+    """)
+    return cur.fetchall()
+
+def fetch_poem_details(cur, poem_ids):
+    cur.execute("""
+        SELECT p.id, p.title, p.url, p.body, p.audio_url,
+               a.title, a.url, a.birth_year, a.death_year
+        FROM poems p LEFT JOIN authors a ON a.id = p.author_id
+        WHERE p.id = ANY(%s);
+    """, (list(poem_ids),))
+    return {row[0]: row[1:] for row in cur.fetchall()}
+
+def parse_place(value, airports):
+    # "SEA", "KSEA" or "47.45,-122.31"
+    if "," in value:
+        lat, lon = value.split(",", 1)
+        return float(lat), float(lon), value
+    code = value.upper()
+    if airports is None or code not in airports:
+        raise ValueError(f"Unknown airport '{value}' (pass --airports or lat,lon).")
+    return airports[code]
+
+def build_route(args):
+    if args.track:
+        points = load_gpx(args.track) if args.track.lower().endswith(".gpx") else load_csv_track(args.track)
+        return Route(points, args.step), os.path.splitext(os.path.basename(args.track))[0]
+    if not (args.origin and args.destination):
+        raise SystemExit("Pass --from and --to, or --track.")
+    airports = load_airports(args.airports) if os.path.exists(args.airports) else None
+    origin = parse_place(args.origin, airports)
+    destination = parse_place(args.destination, airports)
+    points = great_circle_points(origin[:2], destination[:2], args.step)
+    return Route(points, args.step), f"{args.origin.upper()}-{args.destination.upper()}"
+
+def select_poems(route, poem_points, corridor_km, max_per_location):
+    """
+    Return {poem id: (km flown, pass distance, description, lat, lon)} for poems
+    whose location passes within `corridor_km`, keeping each poem's closest pass
+    and at most `max_per_location` poems per location.
+    """
+    by_location = {}
+    for poem_id, description, lat, lon in poem_points:
+        by_location.setdefault((description, lat, lon), []).append(poem_id)
+
+    selected = {}
+    for (description, lat, lon), poem_ids in by_location.items():
+        approach = route.closest_approach(lat, lon, corridor_km)
+        if approach is None:
+            continue
+        # Hash order is stable across runs but does not always favour the oldest poems.
+        poem_ids.sort(key=lambda pid: hashlib.sha1(str(pid).encode()).hexdigest())
+        for poem_id in poem_ids[:max_per_location]:
+            current = selected.get(poem_id)
+            if current is None or approach[1] < current[1]:
+                selected[poem_id] = (*approach, description, lat, lon)
+    return selected
+
+def years_text(birth_year, death_year):
+    years = [str(y) for y in (birth_year, death_year) if y and str(y).lower() != "none"]
+    return " - ".join(years)
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an offline, time-ordered poem playlist for a flight.")
+    parser.add_argument("--from", dest="origin", help="Origin airport (IATA/ICAO code) or lat,lon.")
+    parser.add_argument("--to", dest="destination", help="Destination airport (IATA/ICAO code) or lat,lon.")
+    parser.add_argument("--track", help="GPX or CSV (lat,lon columns) track to follow instead of a great circle.")
+    parser.add_argument("--airports", default="airports.csv", help="OurAirports airports.csv for airport codes.")
+    parser.add_argument("--speed", type=float, default=850.0, help="Cruise ground speed in km/h.")
+    parser.add_argument("--corridor", type=float, default=50.0,
+                        help="Include poems whose location passes within this many km.")
+    parser.add_argument("--max-per-location", type=int, default=3, help="Poems per location at most.")
+    parser.add_argument("--step", type=float, default=5.0, help="Route resolution in km.")
+    parser.add_argument("--departure", help="Departure time (ISO 8601), stored in the bundle for the player.")
+    parser.add_argument("--output", default="flight-bundle", help="Bundle directory to write.")
+    args = parser.parse_args()
+
+    route, name = build_route(args)
+    conn = connect_db()
+    cur = conn.cursor()
+    selected = select_poems(route, fetch_poem_points(cur), args.corridor, args.max_per_location)
+    details = fetch_poem_details(cur, selected)
+    cur.close()
+    conn.close()
+
+    poems = []
+    for poem_id, (along_km, distance_km, description, lat, lon) in selected.items():
+        title, url, body, audio_url, author, author_url, birth_year, death_year = details[poem_id]
+        poems.append({
+            "id": poem_id,
+            "title": title,
+            "url": url,
+            "body": body,
+            "audio_url": audio_url,
+            "audio_file": None,
+            "author": author,
+            "author_url": author_url,
+            "author_years": years_text(birth_year, death_year),
+            "location_description": description,
+            "lat": round(lat, 5),
+            "lon": round(lon, 5),
+            "offset_seconds": round(along_km / args.speed * 3600),
+            "pass_distance_km": round(distance_km, 1),
+        })
+    poems.sort(key=lambda poem: (poem["offset_seconds"], poem["pass_distance_km"]))
+
+    bundle = {
+        "version": BUNDLE_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "route": {
+            "name": name,
+            "points": route.simplified(),
+            "length_km": round(route.length_km, 1),
+            "speed_kmh": args.speed,
+            "corridor_km": args.corridor,
+            "duration_seconds": round(route.length_km / args.speed * 3600),
+            "departure": args.departure,
+        },
+        "poems": poems,
+    }
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, "playlist.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(bundle, f, ensure_ascii=False, separators=(",", ":"))
+    print(f"Route {name}: {route.length_km:.0f} km, {bundle['route']['duration_seconds'] / 3600:.1f} h; "
+          f"{len(poems)} poems within {args.corridor:g} km written to {path}.")
+
+if __name__ == "__main__":
+    main()
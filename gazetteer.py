@@ -0,0 +1,157 @@
+import os
+import re
+import sqlite3
+import threading
+
+DEFAULT_GAZETTEER_PATH = os.path.join("cache", "gazetteer.sqlite")
+
+CONTINENTS = {
+    "AF": "Africa",
+    "AN": "Antarctica",
+    "AS": "Asia",
+    "EU": "Europe",
+    "NA": "North America",
+    "OC": "Oceania",
+    "SA": "South America",
+}
+# Common ways of writing a country that GeoNames' countryInfo does not list.
+COUNTRY_ALIASES = {
+    "US": ["usa", "u s a", "united states of america", "america"],
+    "GB": ["uk", "u k", "england", "scotland", "wales", "northern ireland", "great britain", "britain"],
+}
+
+def gazetteer_path():
+    return os.environ.get("GAZETTEER_PATH", DEFAULT_GAZETTEER_PATH)
+
+def name_key(name):
+    # Case-, accent-insensitive-enough and punctuation-free form used for matching.
+    return " ".join(re.sub(r"[^\w\s]", " ", name.casefold()).split())
+
+# --- Building the index from GeoNames dumps ---
+def build_index(geonames_path, admin1_path, country_info_path, out_path,
+                feature_classes="PAHTL", min_population=0):
+    """
+    Load a GeoNames table dump (allCountries.txt, cities15000.txt, ...) plus
+    admin1CodesASCII.txt and countryInfo.txt into a compact SQLite index:
+    name/alias -> place, with the country and admin1 codes used for
+    disambiguation. Returns the number of places indexed.
+    """
+    # One letter per class; as a set, an empty class column matches nothing.
+    feature_classes = set(feature_classes)
+    if os.path.exists(out_path):
+        os.remove(out_path)
+    if os.path.dirname(out_path):
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    db = sqlite3.connect(out_path)
+    db.executescript("""
+        CREATE TABLE places (
+            geonameid INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            lat REAL NOT NULL,
+            lon REAL NOT NULL,
+            feature_class TEXT,
+            country TEXT,
+            admin1 TEXT,
+            population INTEGER
+        );
+        CREATE TABLE names (name_key TEXT NOT NULL, geonameid INTEGER NOT NULL);
+        CREATE TABLE countries (code TEXT PRIMARY KEY, iso3 TEXT, name TEXT, continent TEXT);
+        CREATE TABLE admin1 (code TEXT PRIMARY KEY, name TEXT);
+    """)
+
+    with open(country_info_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#") or not line.strip():
+                continue
+            cols = line.rstrip("\n").split("\t")
+            db.execute("INSERT INTO countries VALUES (?, ?, ?, ?)", (cols[0], cols[1], cols[4], cols[8]))
+
+    with open(admin1_path, "r", encoding="utf-8") as f:
+        for line in f:
+            cols = line.rstrip("\n").split("\t")
+            if len(cols) >= 2:
+                db.execute("INSERT OR REPLACE INTO admin1 VALUES (?, ?)", (cols[0], cols[1]))
+
+    count = 0
+    with open(geonames_path, "r", encoding="utf-8") as f:
+        for line in f:
+            cols = line.rstrip("\n").split("\t")
+            if len(cols) < 15 or cols[6] not in feature_classes:
+                continue
+            population = int(cols[14] or 0)
+            if population < min_population and cols[6] == "P":
+                continue
+            geonameid = int(cols[0])
+            db.execute(
+                "INSERT INTO places VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (geonameid, cols[1], float(cols[4]), float(cols[5]), cols[6], cols[8], cols[10], population),
+            )
+            aliases = {cols[1], cols[2], *cols[3].split(",")}
+            keys = {name_key(alias) for alias in aliases if alias and "http" not in alias}
+            db.executemany("INSERT INTO names VALUES (?, ?)", [(key, geonameid) for key in keys if key])
+            count += 1
+    db.execute("CREATE INDEX names_key_idx ON names (name_key)")
+    db.commit()
+    db.execute("VACUUM")
+    db.close()
+    return count
+
+# --- Lookup ---
+class Gazetteer:
+    """
+    Offline geocoder over an index built by build_index(). A description such as
+    "Portland, OR, US" is split into a place name and qualifiers; every qualifier
+    must match the candidate's country, admin1 region or continent. Among the
+    candidates left, the most populous wins.
+    """
+    def __init__(self, path=DEFAULT_GAZETTEER_PATH):
+        self.db = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.country_keys = {}
+        self.continent_keys = {}
+        for code, iso3, name, continent in self.db.execute("SELECT code, iso3, name, continent FROM countries"):
+            keys = {name_key(code), name_key(iso3), name_key(name), *COUNTRY_ALIASES.get(code, [])}
+            self.country_keys[code] = keys
+            self.continent_keys[code] = {name_key(continent), name_key(CONTINENTS.get(continent, ""))}
+        self.admin1_keys = {}
+        for code, name in self.db.execute("SELECT code, name FROM admin1"):
+            # "US.OR" -> matches "or" and "oregon"
+            self.admin1_keys[code] = {name_key(code.split(".", 1)[1]), name_key(name)}
+        self.lookups = 0
+        self.resolved = 0
+
+    def matches(self, qualifier, country, admin1):
+        return (
+            qualifier in self.country_keys.get(country, ())
+            or qualifier in self.admin1_keys.get(f"{country}.{admin1}", ())
+            or qualifier in self.continent_keys.get(country, ())
+        )
+
+    def lookup(self, description):
+        """Return (lat, lon) for `description`, or None when the index has no confident match."""
+        parts = [name_key(part) for part in description.split(",")]
+        parts = [part for part in parts if part]
+        with self.lock:
+            self.lookups += 1
+            if not parts:
+                return None
+            candidates = self.db.execute("""
+                SELECT p.lat, p.lon, p.country, p.admin1, p.population
+                FROM names n JOIN places p ON p.geonameid = n.geonameid
+                WHERE n.name_key = ?
+            """, (parts[0],)).fetchall()
+        qualifiers = parts[1:]
+        best = None
+        for lat, lon, country, admin1, population in candidates:
+            if all(self.matches(q, country, admin1) for q in qualifiers):
+                if best is None or population > best[2]:
+                    best = (lat, lon, population)
+        if best is None:
+            return None
+        with self.lock:
+            self.resolved += 1
+        return best[0], best[1]
+
+    def stats(self):
+        rate = self.resolved / self.lookups if self.lookups else 0.0
+        return f"Gazetteer: resolved {self.resolved} of {self.lookups} lookups ({rate:.0%})"
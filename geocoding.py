@@ -0,0 +1,199 @@
+import os
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+from enrichment import QuotaError
+from gazetteer import Gazetteer, gazetteer_path
+from metrics import default_metrics, error_label
+
+GEOCODE_ENDPOINT = "https://maps.googleapis.com/maps/api/geocode/json"
+DEFAULT_CACHE_PATH = os.path.join("cache", "geocode.sqlite")
+
+# How long each kind of answer is trusted. Only answers about the place itself
+# are cached; REQUEST_DENIED, INVALID_REQUEST, UNKNOWN_ERROR and the like say
+# more about the key or the service than the description, so they are raised
+# (OVER_QUERY_LIMIT as a QuotaError) and the next run asks again.
+DAY = 24 * 60 * 60
+STATUS_TTLS = {
+    "OK": 365 * DAY,
+    "ZERO_RESULTS": 30 * DAY,
+}
+
+class GeocodeError(Exception):
+    """The geocoder answered without a usable location (the status is in `status`)."""
+    def __init__(self, description, status):
+        super().__init__(f"Geocoding error for '{description}': {status}")
+        self.status = status
+
+def normalize_description(description):
+    # Cache key: case and whitespace differences should not cost another lookup.
+    return " ".join(description.casefold().split())
+
+# --- Cache ---
+class GeocodeCache:
+    """
+    SQLite-backed store of geocoding answers, both hits and ZERO_RESULTS,
+    with an in-process LRU in front. Safe to share between threads.
+    """
+    def __init__(self, path=DEFAULT_CACHE_PATH, lru_size=10000):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS geocode_cache (
+                key TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                lat REAL,
+                lng REAL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        self.db.commit()
+        self.lock = threading.Lock()
+        self.lru = OrderedDict()
+        self.lru_size = lru_size
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, key, entry):
+        self.lru[key] = entry
+        self.lru.move_to_end(key)
+        if len(self.lru) > self.lru_size:
+            self.lru.popitem(last=False)
+
+    def get(self, key):
+        """Return (status, lat, lng) or None when missing or expired."""
+        now = time.time()
+        with self.lock:
+            entry = self.lru.get(key)
+            if entry is None:
+                entry = self.db.execute(
+                    "SELECT status, lat, lng, expires_at FROM geocode_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if entry is not None:
+                    self._remember(key, entry)
+            else:
+                self.lru.move_to_end(key)
+            # Error statuses stored by older versions are no longer trusted.
+            fresh = entry is not None and entry[3] >= now and entry[0] in STATUS_TTLS
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+        default_metrics().count("geocode_cache_lookups_total", result="hit" if fresh else "miss")
+        return entry[:3] if fresh else None
+
+    def put(self, key, status, lat=None, lng=None):
+        if status not in STATUS_TTLS:
+            return
+        entry = (status, lat, lng, time.time() + STATUS_TTLS[status])
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO geocode_cache (key, status, lat, lng, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (key, *entry),
+            )
+            self.db.commit()
+            self._remember(key, entry)
+
+# --- Geocoder ---
+class Geocoder:
+    """
+    Geocoder with three tiers: the offline gazetteer (when an index exists),
+    then the cache of earlier remote answers, then the Google Geocoding API
+    through one pooled session. With `offline` set the remote tier is skipped.
+    """
+    def __init__(self, cache=None, endpoint=None, api_key=None, pool_size=16, gazetteer=None, offline=None):
+        load_dotenv()
+        if gazetteer is None:
+            if os.path.exists(gazetteer_path()):
+                gazetteer = Gazetteer(gazetteer_path())
+        self.gazetteer = gazetteer
+        if offline is None:
+            offline = os.environ.get("GEOCODE_OFFLINE", "") not in ("", "0")
+        self.offline = offline
+        self.api_key = api_key or os.environ.get("GOOGLE_API_KEY")
+        self.endpoint = endpoint or os.environ.get("GEOCODE_ENDPOINT", GEOCODE_ENDPOINT)
+        self.cache = cache or GeocodeCache(os.environ.get("GEOCODE_CACHE_PATH", DEFAULT_CACHE_PATH))
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def lookup(self, description):
+        if not self.api_key:
+            raise Exception("GOOGLE_API_KEY not set in environment.")
+        response = self.session.get(self.endpoint, params={"address": description, "key": self.api_key}, timeout=30)
+        if response.status_code == 429:
+            raise QuotaError(f"Geocoding rate limited for '{description}'")
+        response.raise_for_status()
+        data = response.json()
+        status = data.get("status")
+        if status == "OVER_QUERY_LIMIT":
+            raise QuotaError(f"Geocoding quota exceeded for '{description}'")
+        if status == "OK" and data["results"]:
+            location = data["results"][0]["geometry"]["location"]
+            return "OK", location["lat"], location["lng"]
+        if status in ("OK", "ZERO_RESULTS"):
+            return "ZERO_RESULTS", None, None
+        # Not cached: a bad key or a passing service error must not stick to the place.
+        raise GeocodeError(description, status or "UNKNOWN_ERROR")
+
+    def _resolve(self, description):
+        """Return (source, status, (lat, lng) or None), asking one tier after another."""
+        if self.gazetteer is not None:
+            coords = self.gazetteer.lookup(description)
+            if coords is not None:
+                return "gazetteer", "OK", coords
+        key = normalize_description(description)
+        cached = self.cache.get(key)
+        source = "cache"
+        if cached is None:
+            if self.offline:
+                # Not cached: a later online run should still get to ask the API.
+                return "offline", "NOT_IN_GAZETTEER", None
+            cached = self.lookup(description)
+            self.cache.put(key, *cached)
+            source = "api"
+        status, lat, lng = cached
+        return source, status, ((lat, lng) if status == "OK" else None)
+
+    def geocode(self, description):
+        """Return (lat, lon) for `description`, or raise GeocodeError for a (cached) non-OK answer."""
+        metrics = default_metrics()
+        start = time.perf_counter()
+        try:
+            source, status, coords = self._resolve(description)
+        except Exception as e:
+            metrics.count("geocode_errors_total", error=error_label(e))
+            raise
+        elapsed = time.perf_counter() - start
+        metrics.observe("geocode_seconds", elapsed, source=source)
+        metrics.count("geocode_results_total", source=source, status=status)
+        metrics.event("geocode", seconds=round(elapsed, 4), source=source, status=status, description=description)
+        if coords is None:
+            raise GeocodeError(description, status)
+        return coords
+
+    def stats(self):
+        lines = [f"Geocode cache: {self.cache.hits} hits, {self.cache.misses} misses"]
+        if self.gazetteer is not None:
+            lines.insert(0, self.gazetteer.stats())
+        return "\n".join(lines)
+
+_default_geocoder = None
+_default_lock = threading.Lock()
+
+def default_geocoder():
+    # One geocoder (cache + HTTP pool) per process, shared by every caller.
+    global _default_geocoder
+    with _default_lock:
+        if _default_geocoder is None:
+            _default_geocoder = Geocoder()
+        return _default_geocoder
+
+def geocode_location(description):
+    return default_geocoder().geocode(description)
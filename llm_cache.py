@@ -0,0 +1,70 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from metrics import default_metrics
+
+DEFAULT_CACHE_PATH = os.path.join("cache", "llm.sqlite")
+
+def cache_key(model, prompt_version, *inputs):
+    # Content address: the same model, prompt template and input always map to the same key.
+    payload = json.dumps([model, prompt_version, *inputs], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class LLMCache:
+    """
+    Durable store of parsed model responses keyed by cache_key(). Entries never
+    expire; bump the caller's prompt version to invalidate them. Safe to share
+    between threads.
+    """
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self.db.commit()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            row = self.db.execute("SELECT response FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        default_metrics().count("llm_cache_lookups_total", result="miss" if row is None else "hit")
+        return None if row is None else json.loads(row[0])
+
+    def put(self, key, response):
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(response, ensure_ascii=False), time.time()),
+            )
+            self.db.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f"LLM cache: {self.hits} hits, {self.misses} misses ({rate:.0%} hit rate)"
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def default_llm_cache():
+    # One cache per process, shared by every caller.
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = LLMCache(os.environ.get("LLM_CACHE_PATH", DEFAULT_CACHE_PATH))
+        return _default_cache
@@ -0,0 +1,172 @@
+import re
+import threading
+from difflib import SequenceMatcher
+
+# --- Canonical keys for location descriptions ---
+# "Portland, OR, US", "Portland, Oregon, US" and "portland, oregon" all reduce to
+# the key "portland, oregon"; descriptions with the same key are the same place.
+
+US_STATES = {
+    "al": "alabama", "ak": "alaska", "az": "arizona", "ar": "arkansas", "ca": "california",
+    "co": "colorado", "ct": "connecticut", "de": "delaware", "dc": "district of columbia",
+    "fl": "florida", "ga": "georgia", "hi": "hawaii", "id": "idaho", "il": "illinois",
+    "in": "indiana", "ia": "iowa", "ks": "kansas", "ky": "kentucky", "la": "louisiana",
+    "me": "maine", "md": "maryland", "ma": "massachusetts", "mi": "michigan", "mn": "minnesota",
+    "ms": "mississippi", "mo": "missouri", "mt": "montana", "ne": "nebraska", "nv": "nevada",
+    "nh": "new hampshire", "nj": "new jersey", "nm": "new mexico", "ny": "new york",
+    "nc": "north carolina", "nd": "north dakota", "oh": "ohio", "ok": "oklahoma", "or": "oregon",
+    "pa": "pennsylvania", "ri": "rhode island", "sc": "south carolina", "sd": "south dakota",
+    "tn": "tennessee", "tx": "texas", "ut": "utah", "vt": "vermont", "va": "virginia",
+    "wa": "washington", "wv": "west virginia", "wi": "wisconsin", "wy": "wyoming",
+}
+US_STATE_NAMES = set(US_STATES.values())
+
+COUNTRY_VARIANTS = {
+    "us": "us", "usa": "us", "u s": "us", "u s a": "us", "united states": "us",
+    "united states of america": "us", "america": "us",
+    "uk": "uk", "u k": "uk", "united kingdom": "uk", "great britain": "uk",
+}
+
+# Leading words that tell neighbouring places apart ("East Orange" vs "West
+# Orange", "New Hanover" vs "Hanover"); fuzzy suggestions never vary them.
+DISTINGUISHING_WORDS = {
+    "east", "west", "north", "south", "northeast", "northwest", "southeast", "southwest",
+    "upper", "lower", "new", "old", "great", "little", "greater", "central", "port", "fort", "mount", "saint",
+}
+
+# Word-level abbreviations in place names.
+WORD_ABBREVIATIONS = {"mt": "mount", "ft": "fort", "st": "saint", "mtns": "mountains", "mts": "mountains"}
+
+NOT_A_LOCATION = "N/A"
+
+def fold(text):
+    # Casefold, drop punctuation and collapse whitespace.
+    return " ".join(re.sub(r"[^\w\s]", " ", text.casefold()).split())
+
+def canonical_key(description):
+    parts = [fold(part) for part in description.split(",")]
+    parts = [part for part in parts if part]
+    if not parts:
+        return ""
+    name = " ".join(WORD_ABBREVIATIONS.get(word, word) for word in parts[0].split())
+    qualifiers = [COUNTRY_VARIANTS.get(part, part) for part in parts[1:]]
+    # Two letters only name a US state when the US follows: "Wilmington, DE,
+    # Germany" and "..., CA, Canada" keep their own qualifiers.
+    for i, part in enumerate(qualifiers[:-1]):
+        if qualifiers[i + 1] == "us":
+            qualifiers[i] = US_STATES.get(part, part)
+    # A US state already pins the country, so "..., Oregon, US" == "..., Oregon".
+    if len(qualifiers) >= 2 and qualifiers[-1] == "us" and qualifiers[-2] in US_STATE_NAMES:
+        qualifiers.pop()
+    return ", ".join([name, *qualifiers])
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+# --- Alias index ---
+class LocationIndex:
+    """
+    Maps location descriptions to the first stored description of the same
+    place, by canonical key. Near-identical names (same qualifiers, same
+    words apart from spelling, name similarity of at least `threshold`) are
+    only offered by suggest(), as they are as often different places
+    ("Greenville"/"Greeneville") as misspellings. Safe to share between threads.
+    """
+    def __init__(self, descriptions=(), threshold=0.9, min_fuzzy_length=6):
+        self.threshold = threshold
+        self.min_fuzzy_length = min_fuzzy_length
+        self.lock = threading.Lock()
+        self.by_key = {}
+        # (qualifiers, trigram) -> names with that trigram
+        self.trigram_index = {}
+        # (qualifiers, name) -> key
+        self.names = {}
+        for description in descriptions:
+            self.add(description)
+
+    @classmethod
+    def load(cls, cur, **kwargs):
+        # Oldest rows first, so they stay the canonical description.
+        cur.execute("SELECT location_description FROM locations ORDER BY id;")
+        return cls((row[0] for row in cur.fetchall()), **kwargs)
+
+    def _split(self, key):
+        name, _, qualifiers = key.partition(", ")
+        return name, qualifiers
+
+    def _add(self, key, description):
+        self.by_key[key] = description
+        name, qualifiers = self._split(key)
+        self.names.setdefault((qualifiers, name), key)
+        for gram in trigrams(name):
+            self.trigram_index.setdefault((qualifiers, gram), set()).add(name)
+
+    def _comparable(self, name, candidate):
+        # Same number of words, and leading/directional words spelled the same.
+        words, other = name.split(), candidate.split()
+        if len(words) != len(other):
+            return False
+        return all(a == b for a, b in zip(words, other) if a in DISTINGUISHING_WORDS or b in DISTINGUISHING_WORDS)
+
+    def _fuzzy(self, key):
+        name, qualifiers = self._split(key)
+        if len(name) < self.min_fuzzy_length:
+            return None
+        grams = trigrams(name)
+        shared = {}
+        for gram in grams:
+            for candidate in self.trigram_index.get((qualifiers, gram), ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+        best, best_score = None, self.threshold
+        for candidate, count in shared.items():
+            # Cheap trigram overlap filter before the exact similarity.
+            if count < len(grams) * 0.5 or len(candidate) < self.min_fuzzy_length or candidate == name:
+                continue
+            if not self._comparable(name, candidate):
+                continue
+            score = SequenceMatcher(None, name, candidate).ratio()
+            if score >= best_score:
+                best, best_score = candidate, score
+        return self.by_key[self.names[(qualifiers, best)]] if best else None
+
+    def resolve(self, description):
+        """Return the stored description for the same place, or None when the place is new."""
+        if description == NOT_A_LOCATION:
+            return description
+        with self.lock:
+            return self.by_key.get(canonical_key(description))
+
+    def suggest(self, description):
+        """Return a stored description with a near-identical name, for review only; None when there is none."""
+        key = canonical_key(description)
+        if not key or description == NOT_A_LOCATION:
+            return None
+        with self.lock:
+            return self._fuzzy(key)
+
+    def add(self, description):
+        if description == NOT_A_LOCATION:
+            return
+        key = canonical_key(description)
+        with self.lock:
+            if key and key not in self.by_key:
+                self._add(key, description)
+
+    def update(self, descriptions):
+        for description in descriptions:
+            self.add(description)
+
+    def canonicalize(self, description):
+        """Return the stored description for the same place, registering `description` if it is new."""
+        if description == NOT_A_LOCATION:
+            return description
+        key = canonical_key(description)
+        if not key:
+            return description
+        with self.lock:
+            existing = self.by_key.get(key)
+            if existing is not None:
+                return existing
+            self._add(key, description)
+            return description
@@ -0,0 +1,196 @@
+import os
+import argparse
+import psycopg2
+from dotenv import load_dotenv
+from enrichment import TokenBucket, EnrichmentPipeline
+from geocoding import default_geocoder, geocode_location
+from llm_cache import default_llm_cache
+from location_canonical import LocationIndex
+from location_resolver import link_locations
+from location_sources import SOURCES
+from metrics import ERROR, CountingCursor, add_metrics_arguments, default_metrics, metrics_from_args
+from place_matcher import PlaceMatcher
+from prompt_text import InputStats, store_prompt_texts
+from work_queue import worker_id, claim_batch, mark_done, mark_failed
+
+# --- Database Connection ---
+def connect_db():
+    load_dotenv()
+    conn_str = os.environ.get("SUPABASE_DB_URL")
+    if not conn_str:
+         raise Exception("SUPABASE_DB_URL not set.")
+    # Every statement is timed and counted as a database round trip.
+    return psycopg2.connect(conn_str, cursor_factory=CountingCursor)
+
+def load_locations(cur):
+    # Oldest rows first, so they stay the canonical description.
+    cur.execute("SELECT location_description FROM locations ORDER BY id;")
+    return [row[0] for row in cur.fetchall()]
+
+# --- Engine ---
+class LocationEnricher:
+    """
+    Adds LLM-extracted, geocoded locations to entity sources (see
+    location_sources.py), one after another in the same process. Every source
+    shares the database connection, the rate limiters and the set of stored
+    locations with its canonical index, besides the process-wide model client,
+    LLM cache and geocoder. A place stored for one source is reused by the
+    next without being geocoded again, and its spelling variants map onto it.
+    """
+    def __init__(self, conn, llm_workers=4, geocode_workers=8, llm_rate=4.0, geocode_rate=25.0, batch_size=10,
+                 lease_seconds=600, max_attempts=3, max_input_tokens=None, prepass_matcher=None, metrics=None):
+        self.conn = conn
+        self.cur = conn.cursor()
+        self.worker = worker_id()
+        descriptions = load_locations(self.cur)
+        self.known_locations = set(descriptions)
+        self.location_index = LocationIndex(descriptions)
+        self.llm_limiter = TokenBucket(llm_rate)
+        self.geocode_limiter = TokenBucket(geocode_rate)
+        self.llm_workers = llm_workers
+        self.geocode_workers = geocode_workers
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.max_input_tokens = max_input_tokens
+        self.prepass_matcher = prepass_matcher
+        self.metrics = metrics or default_metrics()
+        self.input_stats = {}
+
+    def _claim(self, source, input_stats, limit):
+        cur = self.cur
+        batch = claim_batch(cur, source.table, source.columns, source.eligible_sql,
+                            limit, self.worker, self.lease_seconds, self.max_attempts)
+        max_tokens = self.max_input_tokens or source.default_max_tokens
+        items = []
+        for record in batch:
+            raw, text = source.prompt_input(record, max_tokens)
+            input_stats.add(raw, text)
+            items.append((record[0], record[1], text))
+        store_prompt_texts(cur, source.table, {entity_id: text for entity_id, _, text in items})
+        # Commit straight away so other workers see the claims.
+        self.conn.commit()
+        return items
+
+    def _write(self, source, entity_id, resolved_locations, error, method="model"):
+        cur = self.cur
+        if error or not resolved_locations:
+            error = error or "no location descriptions returned"
+            self.metrics.log(f"Error obtaining location info for {source.noun} {entity_id}: {error}", ERROR)
+            mark_failed(cur, source.table, entity_id, self.worker, error)
+            self.conn.commit()
+            return
+        # Descriptions already in `locations` keep their existing row; new ones
+        # are inserted, without geometry when geocoding was skipped or failed.
+        link_locations(cur, source.link_table, source.link_column, {entity_id: resolved_locations})
+        if not mark_done(cur, source.table, entity_id, self.worker, method):
+            # Our lease expired and another worker took the row over; let it finish.
+            self.conn.rollback()
+            self.metrics.log(f"Lease lost for {source.noun} {entity_id}; skipping.", ERROR)
+            return
+        self.conn.commit()
+        descriptions = [desc for desc, _ in resolved_locations]
+        self.known_locations.update(descriptions)
+        self.location_index.update(descriptions)
+        self.metrics.log(f"Updated {source.noun} {entity_id} with location associations: {descriptions}")
+
+    def _prefilter(self, source):
+        if self.prepass_matcher is None or not source.supports_prepass:
+            return None
+        matcher = self.prepass_matcher
+        return lambda title, text: ["N/A"] if matcher.is_location_free(title, text) else None
+
+    def run(self, source):
+        """Enrich every queued row of `source`; returns the number processed."""
+        input_stats = self.input_stats.setdefault(source.name, InputStats())
+        pipeline = EnrichmentPipeline(
+            extract=source.extract,
+            prefilter=self._prefilter(source),
+            canonicalize=self.location_index.canonicalize,
+            extract_batch=source.extract_batch,
+            batch_size=self.batch_size,
+            geocode=geocode_location,
+            llm_limiter=self.llm_limiter,
+            geocode_limiter=self.geocode_limiter,
+            known_locations=self.known_locations,
+            llm_workers=self.llm_workers,
+            geocode_workers=self.geocode_workers,
+            source=source.name,
+        )
+        return pipeline.run(
+            lambda limit: self._claim(source, input_stats, limit),
+            lambda entity_id, resolved, error: self._write(
+                source, entity_id, resolved, error, "prepass" if entity_id in pipeline.prefiltered else "model"),
+        )
+
+    def close(self):
+        self.cur.close()
+        self.conn.close()
+
+# --- Command line ---
+def main(sources=None):
+    """
+    Entry point of enrich-locations.py and the add-locations scripts. With
+    `sources` the command enriches exactly those; otherwise --sources picks them.
+    """
+    if sources:
+        description = f"Add LLM-extracted, geocoded locations to {' and '.join(sources)}."
+    else:
+        description = "Add LLM-extracted, geocoded locations to authors and poems in one process."
+    parser = argparse.ArgumentParser(description=description)
+    if not sources:
+        parser.add_argument("--sources", default="authors,poems",
+                            help=f"Comma-separated sources to enrich, in order ({', '.join(SOURCES)}). "
+                                 "Places found for one are reused by the next.")
+    parser.add_argument("--llm-workers", type=int, default=4, help="Concurrent Gemini requests.")
+    parser.add_argument("--geocode-workers", type=int, default=8, help="Concurrent geocoding requests.")
+    parser.add_argument("--llm-rate", type=float, default=4.0, help="Gemini requests per second.")
+    parser.add_argument("--geocode-rate", type=float, default=25.0, help="Geocoding requests per second.")
+    parser.add_argument("--batch-size", type=int, default=10,
+                        help="Entities per Gemini request (1 sends one request per entity).")
+    parser.add_argument("--lease-seconds", type=int, default=600,
+                        help="How long a claimed row stays reserved before another worker may take it.")
+    parser.add_argument("--max-attempts", type=int, default=3, help="Attempts per row before it is left failed.")
+    parser.add_argument("--max-input-tokens", type=int,
+                        help="Approximate token budget for each entity's cleaned text "
+                             "(default: " + ", ".join(f"{s.default_max_tokens} for {s.name}" for s in SOURCES.values()) + ").")
+    parser.add_argument("--prepass", action="store_true",
+                        help="Store poems without any gazetteer place name as location-free instead of asking Gemini.")
+    parser.add_argument("--prepass-min-population", type=int, default=5000,
+                        help="Smallest populated place whose names the pre-pass looks for.")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    metrics = metrics_from_args(args)
+
+    names = sources or [name.strip() for name in args.sources.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SOURCES]
+    if unknown or not names:
+        parser.error(f"--sources takes a comma-separated subset of {','.join(SOURCES)}")
+
+    matcher = None
+    if args.prepass:
+        matcher = PlaceMatcher.from_gazetteer(min_population=args.prepass_min_population)
+    enricher = LocationEnricher(
+        connect_db(),
+        llm_workers=args.llm_workers,
+        geocode_workers=args.geocode_workers,
+        llm_rate=args.llm_rate,
+        geocode_rate=args.geocode_rate,
+        batch_size=args.batch_size,
+        lease_seconds=args.lease_seconds,
+        max_attempts=args.max_attempts,
+        max_input_tokens=args.max_input_tokens,
+        prepass_matcher=matcher,
+        metrics=metrics,
+    )
+    for name in names:
+        enricher.run(SOURCES[name])
+    enricher.close()
+
+    print(default_llm_cache().stats())
+    print(default_geocoder().stats())
+    for name, input_stats in enricher.input_stats.items():
+        print(f"{name}: {input_stats.summary()}")
+    print(metrics.summary())
+    metrics.close()
+    print("Enrichment complete.")
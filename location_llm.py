@@ -0,0 +1,141 @@
+import os
+import json
+from functools import lru_cache
+from dotenv import load_dotenv
+from google import genai
+from google.genai import types
+from llm_cache import cache_key, default_llm_cache
+from metrics import DEBUG, ERROR, default_metrics
+
+MODEL = 'gemini-2.0-flash'
+
+LOCATION_LIST_SCHEMA = {
+    'type': 'array',
+    'items': {
+        'type': 'string'
+    }
+}
+# Batched prompts answer with one {"id", "locations"} object per entity.
+BATCH_SCHEMA = {
+    'type': 'array',
+    'items': {
+        'type': 'object',
+        'properties': {
+            'id': {'type': 'string'},
+            'locations': LOCATION_LIST_SCHEMA
+        },
+        'required': ['id', 'locations']
+    }
+}
+
+# Initialize the GenAI client using your API key. One client is shared by all
+# callers and threads; GENAI_BASE_URL points it at a stub server for local runs.
+@lru_cache(maxsize=None)
+def init_genai_client():
+    load_dotenv()
+    http_options = None
+    if os.environ.get("GENAI_BASE_URL"):
+        http_options = types.HttpOptions(base_url=os.environ["GENAI_BASE_URL"])
+    return genai.Client(api_key=os.environ.get("GOOGLE_API_KEY"), http_options=http_options)
+
+def generate_json(prompt, schema):
+    """Call the model and return its parsed JSON answer; raises json.JSONDecodeError on a malformed one."""
+    metrics = default_metrics()
+    metrics.log(f"Rendered prompt:\n{prompt}", DEBUG)
+    kind = "batch" if schema is BATCH_SCHEMA else "single"
+    with metrics.timed("llm_request_seconds", model=MODEL, kind=kind) as fields:
+        response = init_genai_client().models.generate_content(
+            model=MODEL,
+            contents=prompt,
+            config=types.GenerateContentConfig(
+                response_mime_type='application/json',
+                response_schema=schema,
+            )
+        )
+        usage = response.usage_metadata
+        fields["prompt_tokens"] = (usage and usage.prompt_token_count) or 0
+        fields["output_tokens"] = (usage and usage.candidates_token_count) or 0
+    metrics.count("llm_prompt_tokens_total", fields["prompt_tokens"], model=MODEL)
+    metrics.count("llm_output_tokens_total", fields["output_tokens"], model=MODEL)
+    metrics.log(f"Raw model response:\n{response.text}", DEBUG)
+    cleaned_text = response.text.strip().strip("```json").strip("```")
+    try:
+        return json.loads(cleaned_text)
+    except json.JSONDecodeError:
+        metrics.count("llm_malformed_responses_total", model=MODEL, kind=kind)
+        raise
+
+def is_location_list(value):
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+def call_once(fn, *args):
+    return fn(*args)
+
+def extract_locations(prompt_version, render_prompt, title, text, call=call_once):
+    """
+    Return the location list for one entity, from the cache when this
+    (model, prompt version, input) was seen before. The model request is made
+    through `call(generate_json, ...)`, so a caller's retries never repeat the
+    cache lookup.
+    """
+    cache = default_llm_cache()
+    key = cache_key(MODEL, prompt_version, title, text)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    try:
+        location_list = call(generate_json, render_prompt(title, text), LOCATION_LIST_SCHEMA)
+    except json.JSONDecodeError as e:
+        default_metrics().log(f"Error parsing GenAI response: {e}", ERROR)
+        return []
+    if not is_location_list(location_list):
+        default_metrics().log(f"Model returned non-list JSON: {location_list}", ERROR)
+        return []
+    # The prompt asks for ["N/A"] when there is nothing to find, so an empty
+    # list is a failed answer; leave it uncached so the next run asks again.
+    if location_list:
+        cache.put(key, location_list)
+    return location_list
+
+def extract_batch_locations(prompt_version, render_batch_prompt, items, call=call_once):
+    """
+    Return {key: location list} for `items` ((key, title, text) tuples) using a
+    single model call for everything not already cached. Entities whose answer
+    is missing or malformed are left out; callers fall back to
+    extract_locations for those. As there, only the model request goes
+    through `call`.
+    """
+    cache = default_llm_cache()
+    results = {}
+    keys = {}
+    pending = []
+    for key, title, text in items:
+        keys[key] = cache_key(MODEL, prompt_version, title, text)
+        cached = cache.get(keys[key])
+        if cached is not None:
+            results[key] = cached
+        else:
+            pending.append((key, title, text))
+    if not pending:
+        return results
+
+    try:
+        answers = call(generate_json, render_batch_prompt(pending), BATCH_SCHEMA)
+    except json.JSONDecodeError as e:
+        default_metrics().log(f"Error parsing batched GenAI response: {e}", ERROR)
+        return results
+    if not isinstance(answers, list):
+        default_metrics().log(f"Model returned non-list JSON for batch: {answers}", ERROR)
+        return results
+
+    by_id = {str(key): key for key, _, _ in pending}
+    for answer in answers:
+        if not isinstance(answer, dict):
+            continue
+        key = by_id.get(str(answer.get("id")))
+        if key is None or not is_location_list(answer.get("locations")):
+            continue
+        results[key] = answer["locations"]
+        if answer["locations"]:
+            cache.put(keys[key], answer["locations"])
+    return results
@@ -0,0 +1,72 @@
+# --- Set-based location resolution shared by the add-locations scripts ---
+# Whatever the number of entities and descriptions, linking costs two
+# statements: one upsert into `locations` and one insert into the join table.
+
+def upsert_locations(cur, resolved):
+    """
+    Insert every description in `resolved` ({description: (lat, lon) or None})
+    that is not in `locations` yet, and return {description: location id} for all
+    of them. Descriptions without coordinates are stored without geometry, and
+    existing rows are left as they are.
+    """
+    if not resolved:
+        return {}
+    descriptions = list(resolved)
+    lats = [coords[0] if coords else None for coords in resolved.values()]
+    lons = [coords[1] if coords else None for coords in resolved.values()]
+    cur.execute("""
+        WITH input AS (
+            SELECT description, lat, lon
+            FROM unnest(%s::text[], %s::float8[], %s::float8[]) AS t(description, lat, lon)
+        ), inserted AS (
+            INSERT INTO locations (location_description, geom)
+            SELECT description,
+                   CASE WHEN lat IS NULL THEN NULL
+                        ELSE ST_SetSRID(ST_MakePoint(lon, lat), 4326)::geography END
+            FROM input
+            ON CONFLICT (location_description) DO NOTHING
+            RETURNING id, location_description
+        )
+        SELECT id, location_description FROM inserted
+        UNION ALL
+        SELECT l.id, l.location_description
+        FROM locations l JOIN input i ON i.description = l.location_description;
+    """, (descriptions, lats, lons))
+    location_ids = {desc: location_id for location_id, desc in cur.fetchall()}
+
+    # A concurrent worker may have inserted a row after our snapshot was taken.
+    missing = [desc for desc in descriptions if desc not in location_ids]
+    if missing:
+        cur.execute(
+            "SELECT id, location_description FROM locations WHERE location_description = ANY(%s);",
+            (missing,)
+        )
+        location_ids.update({desc: location_id for location_id, desc in cur.fetchall()})
+    return location_ids
+
+def link_locations(cur, links_table, link_column, entity_locations):
+    """
+    `entity_locations` maps entity id -> [(description, (lat, lon) or None), ...].
+    Upserts all descriptions at once, then links every entity to its locations
+    in `links_table` (poem_locations / author_locations) with one insert.
+    """
+    resolved = {}
+    for locations in entity_locations.values():
+        for desc, coords in locations:
+            if resolved.get(desc) is None:
+                resolved[desc] = coords
+    location_ids = upsert_locations(cur, resolved)
+
+    pairs = {
+        (entity_id, location_ids[desc])
+        for entity_id, locations in entity_locations.items()
+        for desc, _ in locations
+    }
+    if not pairs:
+        return
+    entity_ids, ids = zip(*pairs)
+    cur.execute(f"""
+        INSERT INTO {links_table} ({link_column}, location_id)
+        SELECT * FROM unnest(%s, %s)
+        ON CONFLICT DO NOTHING;
+    """, (list(entity_ids), list(ids)))
@@ -0,0 +1,199 @@
+from location_llm import call_once, extract_locations, extract_batch_locations
+from prompt_text import DEFAULT_BIO_TOKENS, DEFAULT_POEM_TOKENS, clean_bios, clean_poem
+
+# --- Poems ---
+POEM_RULES = (
+    "Rules:\n"
+    "* Output: Return only a JSON array of strings.\n"
+    "* Specificity: Each location must be precise enough to geocode (e.g., city, town, state, named rivers, lakes, mountains, parks, or landmarks).\n"
+    "* Invalid locations: Do not include generic geographic terms such as \"the coast\", \"the mountains\", or \"the countryside\".\n"
+    "* Country names:\n"
+    "    * Always include country names when part of a city/state/country or landmark/region/country combination (e.g., \"Portland, OR, US\", \"Rocky Mountains, US\", \"Mount Hood, Oregon, US\").\n"
+    "    * Include country names alone only if:\n"
+    "        * The country is relatively small and specific (e.g., \"Luxembourg\", \"Iceland\").\n"
+    "        * No more specific location within that country can be identified.\n"
+    "* If no valid locations are found, return exactly: [\"N/A\"].\n"
+    "* Do not include explanations, comments, markdown formatting, or additional text—only the JSON array.\n\n"
+
+    "Example outputs:\n"
+    "[\"Portland, OR, US\"]\n"
+    "[\"Columbia River, US\", \"Sahara Desert, Africa\"]\n"
+    "[\"N/A\"]\n\n"
+)
+
+def render_poem_prompt(title, text):
+    return (
+        "You are analyzing a poem to identify specific geographic locations.\n"
+        "Return a JSON array of strings, where each string is a location that is either explicitly mentioned, strongly implied, or clearly associated with the content of the poem.\n"
+        "You may use general world knowledge to infer settings from context, such as ecological or cultural clues (e.g., polar bears → Arctic).\n\n"
+        + POEM_RULES +
+        f"Title: {title}\n"
+        f"Text: {text}"
+    )
+
+def render_poem_batch_prompt(items):
+    # One request for several poems: the rules are sent once and each answer is keyed by poem ID.
+    poems = "".join(f"ID: {key}\nTitle: {title}\nText: {text}\n\n" for key, title, text in items)
+    return (
+        "You are analyzing several poems to identify specific geographic locations in each one.\n"
+        "For every poem, find the locations that are either explicitly mentioned, strongly implied, or clearly associated with the content of that poem.\n"
+        "You may use general world knowledge to infer settings from context, such as ecological or cultural clues (e.g., polar bears → Arctic).\n\n"
+        "Return a JSON array with one object per poem: {\"id\": \"<the poem's ID>\", \"locations\": [...]}.\n"
+        "Apply the rules below to each poem's \"locations\" array separately.\n\n"
+        + POEM_RULES +
+        "Poems to Analyze:\n\n"
+        + poems
+    )
+
+# --- Authors ---
+AUTHOR_RULES = (
+    "Rules:\n"
+    "* Output: Return only a JSON array of strings.\n"
+    "* Specificity: Each location must be precise enough to geocode (e.g., city, town, state, named rivers, lakes, mountains, parks, or landmarks).\n"
+    "* Relevant locations only: Do not include places merely mentioned in passing or unrelated to the poet’s personal history or creative work.\n"
+    "* Invalid locations: Do not include country names or generic geographic terms such as \"the coast\", \"the mountains\", or \"the countryside\".\n"
+    "* If no valid locations are found, return exactly: [\"N/A\"].\n"
+    "* Do not include explanations, comments, markdown formatting, or additional text—only the JSON array.\n\n"
+
+    "Example outputs:\n"
+    "[\"Portland, OR, US\"]\n"
+    "[\"Columbia River, US\", \"Sahara Desert, Africa\"]\n"
+    "[\"N/A\"]\n\n"
+)
+
+def render_author_prompt(title, text):
+    return (
+        "You are analyzing information about a poet to identify geographic locations where the poet was born, lived, worked, or explicitly wrote about.\n"
+        "You may also use general knowledge you have about the poet to infer relevant locations, even if those locations do not explicitly appear in the provided poet information.\n\n"
+        + AUTHOR_RULES +
+        "Poet Information to Analyze:\n"
+        f"Poet Name: {title}\n"
+        f"{text}"
+    )
+
+def render_author_batch_prompt(items):
+    # One request for several poets: the rules are sent once and each answer is keyed by poet ID.
+    poets = "".join(f"ID: {key}\nPoet Name: {title}\n{text}\n\n" for key, title, text in items)
+    return (
+        "You are analyzing information about several poets to identify, for each poet, geographic locations where the poet was born, lived, worked, or explicitly wrote about.\n"
+        "You may also use general knowledge you have about each poet to infer relevant locations, even if those locations do not explicitly appear in the provided poet information.\n\n"
+        "Return a JSON array with one object per poet: {\"id\": \"<the poet's ID>\", \"locations\": [...]}.\n"
+        "Apply the rules below to each poet's \"locations\" array separately.\n\n"
+        + AUTHOR_RULES +
+        "Poet Information to Analyze:\n\n"
+        + poets
+    )
+
+# Columns claimed from the queue; author_bios() and author_prompt_text() unpack them.
+AUTHOR_QUEUE_COLUMNS = (
+    "id", "title", "birth_year", "death_year",
+    "bio_foundation", "bio_gale", "bio_poetry", "bio_pol",
+)
+
+def valid_value(value):
+    return value is not None and str(value).lower() != "none"
+
+def author_bios(author_record):
+    _, _, _, _, bio_foundation, bio_gale, bio_poetry, bio_pol = author_record
+    bios = [("Foundation", bio_foundation), ("Gale", bio_gale), ("Poetry", bio_poetry), ("Pol", bio_pol)]
+    return [(label, bio) for label, bio in bios if bio and valid_value(bio)]
+
+def author_prompt_text(author_record, max_tokens=DEFAULT_BIO_TOKENS):
+    # Bios are stripped of HTML, paragraphs repeated across sources are kept
+    # once, and the result is capped at `max_tokens`.
+    author_id, title, birth_year, death_year = author_record[:4]
+    prompt_lines = []
+    bios = clean_bios(author_bios(author_record), max_tokens)
+    if valid_value(birth_year) or valid_value(death_year) or bios:
+        prompt_lines.append("Poet Information:")
+    if valid_value(birth_year):
+        prompt_lines.append(f"Birth Year: {birth_year}")
+    if valid_value(death_year):
+        prompt_lines.append(f"Death Year: {death_year}")
+    if bios:
+        prompt_lines.append(bios)
+    return "\n".join(prompt_lines)
+
+# --- Entity sources ---
+class EntitySource:
+    """
+    One kind of entity to enrich with locations: which rows of `table` are
+    queued, how a claimed row becomes prompt text, how its locations are
+    extracted, and which join table links them. Bump `prompt_version`
+    whenever a prompt changes, so cached answers for the old prompt are not reused.
+    """
+    name = None
+    noun = None
+    table = None
+    columns = ("id", "title")
+    eligible_sql = None
+    link_table = None
+    link_column = None
+    prompt_version = None
+    default_max_tokens = None
+    # Whether --prepass may store rows without a gazetteer place name as location-free.
+    supports_prepass = False
+
+    def render_prompt(self, title, text):
+        raise NotImplementedError
+
+    def render_batch_prompt(self, items):
+        raise NotImplementedError
+
+    def prompt_input(self, record, max_tokens):
+        """Return (raw text, cleaned prompt text) for a claimed row of `columns`."""
+        raise NotImplementedError
+
+    def extract(self, title, text, call=call_once):
+        return extract_locations(self.prompt_version, self.render_prompt, title, text, call)
+
+    def extract_batch(self, items, call=call_once):
+        """Extract locations for several (id, title, text) items in one model call."""
+        return extract_batch_locations(self.prompt_version, self.render_batch_prompt, items, call)
+
+class PoemSource(EntitySource):
+    """Poems that have an audio_url."""
+    name = "poems"
+    noun = "poem"
+    table = "poems"
+    columns = ("id", "title", "body")
+    eligible_sql = "audio_url IS NOT NULL"
+    link_table = "poem_locations"
+    link_column = "poem_id"
+    prompt_version = "poem-v1"
+    default_max_tokens = DEFAULT_POEM_TOKENS
+    supports_prepass = True
+
+    def render_prompt(self, title, text):
+        return render_poem_prompt(title, text)
+
+    def render_batch_prompt(self, items):
+        return render_poem_batch_prompt(items)
+
+    def prompt_input(self, record, max_tokens):
+        # The model sees the poem text without markup, capped at the token budget.
+        body = record[2]
+        return body or "", clean_poem(body, max_tokens)
+
+class AuthorSource(EntitySource):
+    """Authors with at least one poem that has an audio_url."""
+    name = "authors"
+    noun = "author"
+    table = "authors"
+    columns = AUTHOR_QUEUE_COLUMNS
+    eligible_sql = "EXISTS (SELECT 1 FROM poems p WHERE p.author_id = authors.id AND p.audio_url IS NOT NULL)"
+    link_table = "author_locations"
+    link_column = "author_id"
+    prompt_version = "author-v1"
+    default_max_tokens = DEFAULT_BIO_TOKENS
+
+    def render_prompt(self, title, text):
+        return render_author_prompt(title, text)
+
+    def render_batch_prompt(self, items):
+        return render_author_batch_prompt(items)
+
+    def prompt_input(self, record, max_tokens):
+        return "\n".join(bio for _, bio in author_bios(record)), author_prompt_text(record, max_tokens)
+
+SOURCES = {source.name: source for source in (AuthorSource(), PoemSource())}
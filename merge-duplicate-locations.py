@@ -0,0 +1,101 @@
+import os
+import argparse
+import psycopg2
+from dotenv import load_dotenv
+from location_canonical import LocationIndex
+
+# --- Database Connection ---
+def connect_db():
+    load_dotenv()
+    conn_str = os.environ.get("SUPABASE_DB_URL")
+    if not conn_str:
+         raise Exception("SUPABASE_DB_URL not set.")
+    return psycopg2.connect(conn_str)
+
+def find_duplicates(cur, index):
+    """
+    Group `locations` rows whose descriptions have the same canonical key.
+    Returns {survivor row: [duplicate rows]}; the survivor is the oldest row
+    with a geometry, or the oldest row when none has one.
+    """
+    cur.execute("SELECT id, location_description, geom IS NOT NULL FROM locations ORDER BY id;")
+    rows = cur.fetchall()
+    groups = {}
+    for location_id, description, has_geom in rows:
+        canonical = index.canonicalize(description)
+        groups.setdefault(canonical, []).append((location_id, description, has_geom))
+
+    merges = {}
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        survivor = next((m for m in members if m[2]), members[0])
+        merges[survivor] = [m for m in members if m is not survivor]
+    return merges
+
+def find_suggestions(cur, threshold):
+    """
+    Pairs of distinct places with near-identical names, as (description,
+    similar older description). These are never merged automatically.
+    """
+    cur.execute("SELECT location_description FROM locations ORDER BY id;")
+    index = LocationIndex(threshold=threshold)
+    suggestions = []
+    for (description,) in cur.fetchall():
+        if index.resolve(description) is None:
+            similar = index.suggest(description)
+            if similar is not None:
+                suggestions.append((description, similar))
+        index.add(description)
+    return suggestions
+
+def merge_locations(cur, merges):
+    """Repoint every link from the duplicates to their survivor, then delete the duplicates."""
+    duplicate_ids = [dup[0] for dups in merges.values() for dup in dups]
+    survivor_ids = [survivor[0] for survivor, dups in merges.items() for _ in dups]
+    for links_table, link_column in (("poem_locations", "poem_id"), ("author_locations", "author_id")):
+        cur.execute(f"""
+            WITH mapping AS (
+                SELECT * FROM unnest(%s, %s) AS m(duplicate_id, survivor_id)
+            ), moved AS (
+                DELETE FROM {links_table} l
+                USING mapping m
+                WHERE l.location_id = m.duplicate_id
+                RETURNING l.{link_column} AS entity_id, m.survivor_id
+            )
+            INSERT INTO {links_table} ({link_column}, location_id)
+            SELECT DISTINCT entity_id, survivor_id FROM moved
+            ON CONFLICT DO NOTHING;
+        """, (duplicate_ids, survivor_ids))
+        print(f"Repointed {cur.rowcount} {links_table} rows.")
+    cur.execute("DELETE FROM locations WHERE id = ANY(%s);", (duplicate_ids,))
+    print(f"Deleted {cur.rowcount} duplicate locations.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge `locations` rows that describe the same place.")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the rows that would be merged.")
+    parser.add_argument("--threshold", type=float, default=0.9,
+                        help="Name similarity (0-1) above which two places are listed for review (never merged).")
+    args = parser.parse_args()
+
+    conn = connect_db()
+    cur = conn.cursor()
+    merges = find_duplicates(cur, LocationIndex())
+    for survivor, dups in merges.items():
+        print(f"{survivor[1]!r} <- {[dup[1] for dup in dups]}")
+    print(f"{len(merges)} places with duplicates, {sum(len(d) for d in merges.values())} rows to merge.")
+
+    suggestions = find_suggestions(cur, args.threshold)
+    if suggestions:
+        print("Similar names, not merged (check by hand):")
+        for description, similar in suggestions:
+            print(f"  {description!r} ~ {similar!r}")
+
+    if merges and not args.dry_run:
+        merge_locations(cur, merges)
+        conn.commit()
+    cur.close()
+    conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+import psycopg2.extensions
+
+# Log levels: ERROR is problems and end-of-run summaries only, INFO adds one
+# line per entity, DEBUG adds rendered prompts and raw model responses.
+ERROR, INFO, DEBUG = 0, 1, 2
+LOG_LEVELS = {"error": ERROR, "info": INFO, "debug": DEBUG}
+
+METRIC_PREFIX = "window_seat_"
+# Upper bounds in seconds of the latency histogram buckets.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TEXTFILE_INTERVAL = 15
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def error_label(e):
+    # google-genai and requests errors carry an HTTP status; keep it, as 429s matter.
+    code = getattr(e, "code", None) or getattr(getattr(e, "response", None), "status_code", None)
+    return f"{type(e).__name__}:{code}" if code else type(e).__name__
+
+class Metrics:
+    """
+    Counters, gauges and latency histograms shared by every thread of a run,
+    plus levelled logging. With `events_path` each timed operation is also
+    appended to that file as one JSON line; with `textfile_path` everything is
+    rendered in the Prometheus text format every TEXTFILE_INTERVAL seconds
+    (e.g. for node_exporter's textfile collector) and once more on close().
+    """
+    def __init__(self, level=INFO, events_path=None, textfile_path=None):
+        self.level = level
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        # key -> [count per bucket..., overflow, count, sum, max]
+        self.histograms = {}
+        self.local = threading.local()
+        self.events = None
+        if events_path:
+            if os.path.dirname(events_path):
+                os.makedirs(os.path.dirname(events_path), exist_ok=True)
+            self.events = open(events_path, "a", encoding="utf-8", buffering=1)
+        self.textfile_path = textfile_path
+        self.stop = threading.Event()
+        if textfile_path:
+            threading.Thread(target=self._write_periodically, daemon=True, name="metrics").start()
+
+    # --- Logging ---
+    def log(self, message, level=INFO):
+        if level <= self.level:
+            print(message)
+
+    # --- Recording ---
+    def count(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def gauge(self, name, value, **labels):
+        with self.lock:
+            self.gauges[_key(name, labels)] = value
+
+    def observe(self, name, seconds, **labels):
+        key = _key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * (len(BUCKETS) + 1) + [0, 0.0, 0.0]
+            bucket = next((i for i, bound in enumerate(BUCKETS) if seconds <= bound), len(BUCKETS))
+            histogram[bucket] += 1
+            histogram[-3] += 1
+            histogram[-2] += seconds
+            histogram[-1] = max(histogram[-1], seconds)
+
+    def event(self, name, **fields):
+        if self.events is None:
+            return
+        line = json.dumps({"ts": round(time.time(), 3), "event": name, **fields}, ensure_ascii=False, default=str)
+        with self.lock:
+            self.events.write(line + "\n")
+
+    def value(self, name, **labels):
+        """A counter's value or a histogram's observation count (0 when never recorded)."""
+        key = _key(name, labels)
+        with self.lock:
+            if key in self.histograms:
+                return self.histograms[key][-3]
+            return self.counters.get(key, 0)
+
+    @contextmanager
+    def timed(self, name, emit=True, **labels):
+        """
+        Record the block's duration in the `name` histogram and, with `emit`,
+        as an event. Fields put in the yielded dict are added to the event; an
+        exception is counted in `<name>_errors_total` and re-raised.
+        """
+        fields = {}
+        start = time.perf_counter()
+        try:
+            yield fields
+        except Exception as e:
+            fields["error"] = error_label(e)
+            self.count(name.removesuffix("_seconds") + "_errors_total", error=fields["error"], **labels)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe(name, elapsed, **labels)
+            if emit:
+                self.event(name.removesuffix("_seconds"), seconds=round(elapsed, 4), **labels, **fields)
+
+    @contextmanager
+    def stage(self, name):
+        """Time a pipeline stage on this thread; database statements made inside are attributed to it."""
+        previous = getattr(self.local, "stage", None)
+        self.local.stage = name
+        try:
+            with self.timed("stage_seconds", emit=False, stage=name):
+                yield
+        finally:
+            self.local.stage = previous
+
+    def current_stage(self):
+        return getattr(self.local, "stage", None) or "other"
+
+    # --- Output ---
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self.lock:
+            series = [(key, "counter", value) for key, value in self.counters.items()]
+            series += [(key, "gauge", value) for key, value in self.gauges.items()]
+            series += [(key, "histogram", list(value)) for key, value in self.histograms.items()]
+        lines = []
+        typed = set()
+        for (name, labels), kind, value in sorted(series, key=lambda s: (s[0][0], s[0][1])):
+            metric = METRIC_PREFIX + name
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} {kind}")
+            if kind != "histogram":
+                lines.append(f"{metric}{_labels(labels)} {value}")
+                continue
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS + ("+Inf",), value):
+                cumulative += bucket_count
+                lines.append(f"{metric}_bucket{_labels(labels + (('le', str(bound)),))} {cumulative}")
+            lines.append(f"{metric}_sum{_labels(labels)} {value[-2]:.6f}")
+            lines.append(f"{metric}_count{_labels(labels)} {value[-3]}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self):
+        if not self.textfile_path:
+            return
+        if os.path.dirname(self.textfile_path):
+            os.makedirs(os.path.dirname(self.textfile_path), exist_ok=True)
+        tmp_path = self.textfile_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, self.textfile_path)
+
+    def _write_periodically(self):
+        while not self.stop.wait(TEXTFILE_INTERVAL):
+            self.write_textfile()
+
+    def summary(self):
+        """Per-series latency (count, mean, ~p95, max) and the counters, one line each."""
+        with self.lock:
+            histograms = {key: list(value) for key, value in self.histograms.items()}
+            counters = dict(self.counters)
+        lines = []
+        for (name, labels), value in sorted(histograms.items()):
+            count, total, largest = value[-3], value[-2], value[-1]
+            lines.append(f"  {name}{_labels(labels)}: {count} x, mean {total / max(count, 1) * 1000:.1f} ms, "
+                         f"p95 <= {_quantile(value, 0.95) * 1000:.0f} ms, max {largest * 1000:.0f} ms, total {total:.1f}s")
+        for (name, labels), value in sorted(counters.items()):
+            lines.append(f"  {name}{_labels(labels)}: {value}")
+        return "Metrics:\n" + "\n".join(lines) if lines else "Metrics: nothing recorded."
+
+    def close(self):
+        self.stop.set()
+        self.write_textfile()
+        if self.events is not None:
+            self.events.close()
+            self.events = None
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+def _quantile(histogram, q):
+    # Upper bound of the bucket holding the q-th observation; the maximum past the last bucket.
+    target = q * histogram[-3]
+    cumulative = 0
+    for bound, bucket_count in zip(BUCKETS, histogram):
+        cumulative += bucket_count
+        if cumulative >= target:
+            return min(bound, histogram[-1])
+    return histogram[-1]
+
+# --- Database round trips ---
+class CountingCursor(psycopg2.extensions.cursor):
+    """
+    psycopg2 cursor counting each statement as one round trip in
+    `db_round_trips_total` and timing it in the `db_statement_seconds`
+    histogram, both labelled with the current stage.
+    Use with psycopg2.connect(..., cursor_factory=CountingCursor).
+    """
+    def _round_trip(self):
+        metrics = default_metrics()
+        stage = metrics.current_stage()
+        metrics.count("db_round_trips_total", stage=stage)
+        return metrics.timed("db_statement_seconds", emit=False, stage=stage)
+
+    def execute(self, query, vars=None):
+        with self._round_trip():
+            return super().execute(query, vars)
+
+    def executemany(self, query, vars_list):
+        with self._round_trip():
+            return super().executemany(query, vars_list)
+
+    def copy_expert(self, sql, file, size=8192):
+        with self._round_trip():
+            return super().copy_expert(sql, file, size)
+
+# --- Process-wide instance ---
+_default_metrics = None
+_default_lock = threading.Lock()
+
+def default_metrics():
+    # One registry per process, shared by every caller; INFO logging and no outputs until configured.
+    global _default_metrics
+    with _default_lock:
+        if _default_metrics is None:
+            _default_metrics = Metrics()
+        return _default_metrics
+
+def configure_metrics(level=INFO, events_path=None, textfile_path=None):
+    global _default_metrics
+    with _default_lock:
+        if _default_metrics is not None:
+            _default_metrics.close()
+        _default_metrics = Metrics(level, events_path, textfile_path)
+        return _default_metrics
+
+def add_metrics_arguments(parser):
+    parser.add_argument("--log-level", choices=list(LOG_LEVELS), default="info",
+                        help="error: problems and the final summary; info: a line per entity; "
+                             "debug: also every prompt and raw model response.")
+    parser.add_argument("--metrics-events", help="Append JSON-lines events (model calls, geocodes, entities) to this file.")
+    parser.add_argument("--metrics-textfile",
+                        help=f"Keep Prometheus text-format metrics in this file, rewritten every {TEXTFILE_INTERVAL}s.")
+
+def metrics_from_args(args):
+    return configure_metrics(LOG_LEVELS[args.log_level], args.metrics_events, args.metrics_textfile)
@@ -0,0 +1,78 @@
+import time
+import functools
+import multiprocessing
+from metrics import ERROR, default_metrics
+
+# --- Per-process state, set up once in each worker ---
+_conn = None
+_cur = None
+
+def _init_worker(connect, setup):
+    global _conn, _cur
+    _conn = connect()
+    _cur = _conn.cursor()
+    if setup is not None:
+        setup(_cur)
+        _conn.commit()
+
+def record_import(filepath, count, elapsed, round_trips, error=None, worker=None):
+    """Record one imported (or rolled back) file in the process metrics."""
+    metrics = default_metrics()
+    metrics.observe("import_file_seconds", elapsed)
+    metrics.count("import_rows_total", count)
+    metrics.count("import_files_total", outcome="failed" if error else "committed")
+    metrics.event("import_file", file=str(filepath), worker=worker, rows=count, seconds=round(elapsed, 4),
+                  db_round_trips=round_trips, error=error)
+
+def _import_one(load_file, filepath):
+    """Load one file in its own transaction on this worker's connection."""
+    worker = multiprocessing.current_process().name
+    metrics = default_metrics()
+    round_trips = metrics.value("db_round_trips_total", stage="import")
+    start = time.perf_counter()
+    error = None
+    count = 0
+    with metrics.stage("import"):
+        try:
+            count = load_file(filepath, _cur)
+            _conn.commit()
+        except Exception as e:
+            _conn.rollback()
+            error = f"{type(e).__name__}: {e}"
+    round_trips = metrics.value("db_round_trips_total", stage="import") - round_trips
+    return worker, filepath, count, time.perf_counter() - start, round_trips, error
+
+def import_files(files, load_file, connect, workers, setup=None):
+    """
+    Import `files` with a pool of `workers` processes, each holding its own
+    database connection, taking the next file as soon as it is free.
+    `load_file(filepath, cur)` returns the number of rows loaded and each file
+    is committed (or rolled back) on its own. `setup(cur)` runs once per
+    connection.
+    Every file is recorded in this process's metrics with the database round
+    trips its worker made. Returns the list of (filepath, error) for files that failed.
+    """
+    metrics = default_metrics()
+    start = time.perf_counter()
+    per_worker = {}
+    failed = []
+    total = 0
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(connect, setup)) as pool:
+        jobs = pool.imap_unordered(functools.partial(_import_one, load_file), files)
+        for done, (worker, filepath, count, elapsed, round_trips, error) in enumerate(jobs, 1):
+            files_done, rows, busy = per_worker.get(worker, (0, 0, 0.0))
+            per_worker[worker] = (files_done + 1, rows + count, busy + elapsed)
+            record_import(filepath, count, elapsed, round_trips, error, worker)
+            if error is not None:
+                failed.append((filepath, error))
+                metrics.log(f"[{worker}] Failed {filepath} after {elapsed:.2f}s, rolled back: {error}", ERROR)
+                continue
+            total += count
+            metrics.log(f"[{worker}] Finished {filepath} ({count} rows in {elapsed:.2f}s, "
+                  f"{count / max(elapsed, 1e-9):.0f} rows/s) - {done}/{len(files)} files")
+    elapsed = time.perf_counter() - start
+    for worker, (files_done, rows, busy) in sorted(per_worker.items()):
+        metrics.log(f"[{worker}] {files_done} files, {rows} rows, busy {busy:.1f}s")
+    metrics.log(f"{total} rows from {len(files) - len(failed)} files in {elapsed:.1f}s with {workers} workers "
+          f"({total / max(elapsed, 1e-9):.0f} rows/s); {len(failed)} files failed.", ERROR)
+    return failed
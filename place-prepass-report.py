@@ -0,0 +1,127 @@
+import os
+import argparse
+import psycopg2
+from dotenv import load_dotenv
+from gazetteer import name_key
+from place_matcher import PlaceMatcher
+from prompt_text import DEFAULT_POEM_TOKENS, clean_poem
+from snapshot import Snapshot
+
+# --- Database Connection ---
+def connect_db():
+    load_dotenv()
+    conn_str = os.environ.get("SUPABASE_DB_URL")
+    if not conn_str:
+         raise Exception("SUPABASE_DB_URL not set.")
+    return psycopg2.connect(conn_str)
+
+def decided_by_model(include_unknown):
+    # Poems the pre-pass stored as N/A would only confirm its own decisions.
+    if include_unknown:
+        return "(p.enrich_method = 'model' OR p.enrich_method IS NULL)"
+    return "p.enrich_method = 'model'"
+
+def fetch_enriched_poems(cur, limit, include_unknown=False):
+    # Poems whose locations came from the model; N/A-only poems are the location-free ones.
+    cur.execute(f"""
+        SELECT p.id, p.title, p.body,
+               array_remove(array_agg(l.location_description), 'N/A')
+        FROM poems p
+        JOIN poem_locations pl ON pl.poem_id = p.id
+        JOIN locations l ON l.id = pl.location_id
+        WHERE {decided_by_model(include_unknown)}
+        GROUP BY p.id
+        ORDER BY p.id
+        LIMIT %s;
+    """, (limit,))
+    return cur.fetchall()
+
+def fetch_enriched_locations(cur, limit, include_unknown=False):
+    # As fetch_enriched_poems, without moving titles and bodies over the network.
+    cur.execute(f"""
+        SELECT p.id, array_remove(array_agg(l.location_description), 'N/A')
+        FROM poems p
+        JOIN poem_locations pl ON pl.poem_id = p.id
+        JOIN locations l ON l.id = pl.location_id
+        WHERE {decided_by_model(include_unknown)}
+        GROUP BY p.id
+        ORDER BY p.id
+        LIMIT %s;
+    """, (limit,))
+    return cur.fetchall()
+
+def with_snapshot_text(snapshot, locations):
+    """(id, title, body, locations) rows with the text read from a local corpus snapshot."""
+    poems = []
+    for poem_id, descriptions in locations:
+        row = snapshot.get(poem_id, ("title", "body"))
+        if row is not None:
+            poems.append((poem_id, row["title"], row["body"], descriptions))
+    print(f"{len(poems)} of {len(locations)} enriched poems found in {snapshot.path}.")
+    return poems
+
+def ratio(part, whole):
+    return f"{part}/{whole} ({part / whole:.1%})" if whole else f"{part}/0"
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure the gazetteer pre-pass against the locations already stored in poem_locations.")
+    parser.add_argument("--min-population", type=int, default=5000,
+                        help="Smallest populated place whose names the pre-pass looks for.")
+    parser.add_argument("--limit", type=int, default=1000000, help="Number of enriched poems to check.")
+    parser.add_argument("--show", type=int, default=10, help="Wrongly skipped poems to list.")
+    parser.add_argument("--snapshot", help="Read poem text from this build-snapshot.py file instead of the database.")
+    parser.add_argument("--max-input-tokens", type=int, default=DEFAULT_POEM_TOKENS,
+                        help="Token budget of the cleaned poem text, as given to the add-locations scripts.")
+    parser.add_argument("--include-unknown", action="store_true",
+                        help="Also score poems enriched before sql/005_enrich_method.sql, when no --prepass run stored any of them.")
+    args = parser.parse_args()
+
+    matcher = PlaceMatcher.from_gazetteer(min_population=args.min_population)
+    conn = connect_db()
+    cur = conn.cursor()
+    if args.snapshot:
+        snapshot = Snapshot(args.snapshot)
+        poems = with_snapshot_text(snapshot, fetch_enriched_locations(cur, args.limit, args.include_unknown))
+        snapshot.close()
+    else:
+        poems = fetch_enriched_poems(cur, args.limit, args.include_unknown)
+    cur.close()
+    conn.close()
+
+    skipped = correctly_skipped = located = 0
+    missed = []
+    descriptions = hinted = 0
+    candidates = useful = 0
+    for poem_id, title, body, locations in poems:
+        # The pre-pass sees the cleaned, truncated prompt text, not the stored HTML.
+        found = matcher.find(f"{title}\n{clean_poem(body, args.max_input_tokens)}")
+        has_locations = bool(locations)
+        located += has_locations
+        if not found:
+            skipped += 1
+            if has_locations:
+                missed.append((poem_id, title, locations))
+            else:
+                correctly_skipped += 1
+
+        # How well the matched names line up with what the model returned.
+        parts = {name_key(part) for desc in locations for part in desc.split(",")}
+        descriptions += len(locations)
+        hinted += sum(1 for desc in locations if name_key(desc.split(",")[0]) in found)
+        candidates += len(found)
+        useful += sum(1 for name in found if name in parts)
+
+    location_free = len(poems) - located
+    print(f"Poems checked: {len(poems)} decided by the model ({located} with locations, {location_free} location-free)")
+    print(f"Model requests saved (poems skipped): {ratio(skipped, len(poems))}")
+    print(f"Skip precision (skipped poems that really are location-free): {ratio(correctly_skipped, skipped)}")
+    print(f"Skip recall (location-free poems that were skipped): {ratio(correctly_skipped, location_free)}")
+    print(f"Poems with locations wrongly skipped: {ratio(len(missed), located)}")
+    print(f"Hint recall (stored descriptions whose place name was matched): {ratio(hinted, descriptions)}")
+    print(f"Hint precision (matched names that appear in a stored description): {ratio(useful, candidates)}")
+    for poem_id, title, locations in missed[:args.show]:
+        print(f"  missed poem {poem_id} '{title}': {locations}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import sqlite3
+from collections import deque
+from gazetteer import gazetteer_path, name_key
+
+# Words that point at a setting even when no place is named ("the river", "the
+# desert"). The model often turns these into a location, so a poem containing
+# one is never treated as location-free.
+CUE_WORDS = (
+    "river", "lake", "sea", "ocean", "bay", "harbor", "harbour", "island", "coast",
+    "mountain", "mount", "valley", "desert", "prairie", "forest", "jungle", "glacier",
+    "arctic", "antarctic", "tundra", "savanna", "city", "village", "town", "street",
+    "avenue", "bridge", "subway", "county", "state", "province", "canyon", "volcano",
+)
+
+class PlaceMatcher:
+    """
+    Word-level Aho-Corasick automaton over place names. `find` scans a text once
+    and returns every name that occurs in it as a whole-word sequence.
+    """
+    def __init__(self, names):
+        self.goto = [{}]
+        self.fail = [0]
+        # Token lengths of the patterns ending at each node.
+        self.output = [[]]
+        for name in names:
+            tokens = name_key(name).split()
+            if not tokens:
+                continue
+            node = 0
+            for token in tokens:
+                child = self.goto[node].get(token)
+                if child is None:
+                    child = len(self.goto)
+                    self.goto[node][token] = child
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                node = child
+            if len(tokens) not in self.output[node]:
+                self.output[node].append(len(tokens))
+
+        # Breadth-first pass to set the failure links.
+        pending = deque(self.goto[0].values())
+        while pending:
+            node = pending.popleft()
+            for token, child in self.goto[node].items():
+                pending.append(child)
+                fallback = self.fail[node]
+                while fallback and token not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(token, 0)
+                self.output[child].extend(self.output[self.fail[child]])
+
+    @classmethod
+    def from_gazetteer(cls, path=None, min_population=5000, min_length=4, cue_words=CUE_WORDS):
+        """
+        Build a matcher from the gazetteer index (see build-gazetteer.py): the
+        ASCII names of places with at least `min_population` inhabitants, plus
+        `cue_words`. Single-word names shorter than `min_length` are left out.
+        """
+        db = sqlite3.connect(f"file:{path or gazetteer_path()}?mode=ro", uri=True)
+        rows = db.execute("""
+            SELECT DISTINCT n.name_key
+            FROM names n JOIN places p ON p.geonameid = n.geonameid
+            WHERE p.population >= ?
+        """, (min_population,))
+        names = [
+            key for (key,) in rows
+            if key.isascii() and (" " in key or len(key) >= min_length)
+        ]
+        db.close()
+        return cls(names + list(cue_words))
+
+    def find(self, text):
+        """Return the distinct names found in `text`, in order of appearance."""
+        tokens = name_key(text).split()
+        found = {}
+        node = 0
+        for i, token in enumerate(tokens):
+            while node and token not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(token, 0)
+            for length in self.output[node]:
+                found.setdefault(" ".join(tokens[i - length + 1:i + 1]), None)
+        return list(found)
+
+    def is_location_free(self, title, text):
+        return not self.find(f"{title}\n{text}")
@@ -0,0 +1,294 @@
+import os
+import sys
+import json
+import gzip
+import argparse
+import threading
+import tempfile
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from corpus import iter_entries
+from snapshot import KINDS, Snapshot, snapshot_path
+
+BASE_URL = "https://www.poetryfoundation.org/proxy/graphql"
+AUTH_HEADER = "Basic cGY6cGZwcml2YXRl"
+
+AUTHORS_QUERY = "query SearchPoetEntries($limit: Int = 1000, $offset: Int = 0, $orderBy: String = \"postDate DESC\", $relatedTo: [EntryCriteriaInput], $search: String, $birthYear: [QueryArgument]) {\n  entries(\n    section: \"authors\"\n    limit: $limit\n    offset: $offset\n    orderBy: $orderBy\n    relatedToEntries: $relatedTo\n    search: $search\n    isPoet: true\n    birthYear: $birthYear\n  ) {\n    ...EntryCommon\n    ... on authors_default_Entry {\n      birthYear\n      deathYear\n      foundationBio\n      galeBio\n      poetryBio\n      polBio\n      }\n    }\n  count: entryCount(\n    section: \"authors\"\n    relatedToEntries: $relatedTo\n    search: $search\n    isPoet: true\n    birthYear: $birthYear\n  )\n}\n\nfragment EntryCommon on EntryInterface {\n  id\n  postDate\n  title\n  url\n  }"
+
+POEMS_QUERY = "query SearchEntries($section: [String], $limit: Int = 1000, $offset: Int = 0, $orderBy: String = \"postDate DESC\") {\n  entries(section: $section, limit: $limit, offset: $offset, orderBy: $orderBy) {\n    id\n    postDate\n    title\n    url\n    body\n    authors {\n      id\n      }\n    audioVersion {\n      audioFile {\n        url\n}}\n  }\n  count: entryCount(section: $section)\n}"
+
+def build_payload(kind, limit, offset):
+    if kind == "authors":
+        return {
+            "operationName": "SearchPoetEntries",
+            "query": AUTHORS_QUERY,
+            "variables": {
+                "limit": limit,
+                "offset": offset,
+                "orderBy": "postDate DESC",
+                "relatedTo": None,
+                "search": None,
+                "birthYear": None
+            }
+        }
+    return {
+        "operationName": "SearchEntries",
+        "query": POEMS_QUERY,
+        "variables": {
+            "section": ["poems"],
+            "limit": limit,
+            "offset": offset,
+            "orderBy": "postDate DESC"
+        }
+    }
+
+# --- HTTP ---
+def make_session(workers, retries):
+    # One pooled keep-alive connection per worker. urllib3 retries connection
+    # errors and 429/5xx answers with backoff; every request is a GraphQL POST,
+    # so POST has to be retried too (allowed_methods=None).
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=1, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=None)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+        "Authorization": AUTH_HEADER
+    })
+    return session
+
+def fetch_page(session, base_url, kind, limit, offset, timeout=60):
+    response = session.post(base_url, json=build_payload(kind, limit, offset), timeout=timeout)
+    response.raise_for_status()
+    page = response.json()
+    if page.get("errors") or not isinstance((page.get("data") or {}).get("entries"), list):
+        raise Exception(f"Unexpected response for offset {offset}: {str(page)[:200]}")
+    return response.content, page
+
+# --- Output ---
+def write_atomic(path, data):
+    # Write to a temp file in the same directory, then rename over the target.
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def page_filename(offset):
+    return f"page_{offset}.json.gz"
+
+class Manifest:
+    """
+    Per-directory record of which page offsets have been fetched, so a rerun only
+    fetches pages that are missing or failed.
+    """
+    def __init__(self, output_dir, kind, limit):
+        self.path = os.path.join(output_dir, "manifest.json")
+        self.lock = threading.Lock()
+        self.data = {"kind": kind, "limit": limit, "count": None, "pages": {}}
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            # Offsets are only comparable when the page size is unchanged.
+            if saved.get("kind") == kind and saved.get("limit") == limit:
+                self.data = saved
+
+    def save(self):
+        write_atomic(self.path, json.dumps(self.data, indent=2).encode("utf-8"))
+
+    def pending_offsets(self, output_dir):
+        offsets = []
+        for offset in range(0, self.data["count"], self.data["limit"]):
+            entry = self.data["pages"].get(str(offset))
+            done = entry and entry["status"] == "done"
+            if not done or not os.path.exists(os.path.join(output_dir, entry["file"])):
+                offsets.append(offset)
+        return offsets
+
+    def record(self, offset, **fields):
+        with self.lock:
+            self.data["pages"][str(offset)] = fields
+            self.save()
+
+def save_page(output_dir, manifest, offset, content, page):
+    filename = page_filename(offset)
+    write_atomic(os.path.join(output_dir, filename), gzip.compress(content))
+    manifest.record(offset, status="done", file=filename, entries=len(page["data"]["entries"]))
+
+# --- Incremental sync ---
+# Both queries sort by postDate DESC, so everything newer than the newest entry
+# we have already seen sits at the front of the listing.
+def parse_post_date(value):
+    return datetime.fromisoformat(value)
+
+def high_water_mark(entries):
+    dated = [(parse_post_date(e["postDate"]), e["id"]) for e in entries if e.get("postDate")]
+    if not dated:
+        return None
+    newest = max(date for date, _ in dated)
+    return {"post_date": newest.isoformat(), "ids": sorted(i for date, i in dated if date == newest)}
+
+def sync_state_path(output_dir):
+    return os.path.join(output_dir, "sync_state.json")
+
+def load_sync_state(output_dir):
+    path = sync_state_path(output_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_sync_state(output_dir, state):
+    write_atomic(sync_state_path(output_dir), json.dumps(state, indent=2).encode("utf-8"))
+
+def later_mark(old, new):
+    # A mark never moves back: the newer one wins, and equal dates pool their ids.
+    if not old or not new:
+        return old or new
+    old_date, new_date = parse_post_date(old["post_date"]), parse_post_date(new["post_date"])
+    if old_date != new_date:
+        return new if new_date > old_date else old
+    return {"post_date": old["post_date"], "ids": sorted(set(old["ids"]) | set(new["ids"]))}
+
+def sync(session, base_url, kind, limit, output_dir):
+    """
+    Page from the newest entry until reaching the recorded high-water mark and
+    write only the unseen entries to delta/page_<timestamp>.json.gz.
+    """
+    state = load_sync_state(output_dir)
+    snapshot = Snapshot(snapshot_path(output_dir)) if os.path.exists(snapshot_path(output_dir)) else None
+    if not state and snapshot is not None:
+        # The snapshot's newest entries are as good a starting point as a full scrape's.
+        state = high_water_mark(
+            {"postDate": row["post_date"], "id": row["id"]} for row in snapshot.rows(columns=("id", "post_date"))
+        )
+    if not state:
+        print("No high-water mark recorded yet; run a full scrape first.")
+        return
+    mark = parse_post_date(state["post_date"])
+    known_ids = set(state["ids"])
+    make_row = KINDS[kind][0]
+    unchanged = 0
+
+    new_entries = {}
+    listed = []
+    offset = 0
+    requests_made = 0
+    while True:
+        _, page = fetch_page(session, base_url, kind, limit, offset)
+        requests_made += 1
+        entries = page["data"]["entries"]
+        reached_mark = False
+        for entry in entries:
+            if not entry.get("postDate"):
+                continue
+            post_date = parse_post_date(entry["postDate"])
+            if post_date < mark:
+                reached_mark = True
+                continue
+            listed.append(entry)
+            if post_date > mark or entry["id"] not in known_ids:
+                stored = snapshot.get(entry["id"], ("content_hash",)) if snapshot is not None else None
+                if stored is not None and stored["content_hash"] == make_row(entry)["content_hash"]:
+                    # Already in the local corpus exactly as listed (e.g. re-dated without edits).
+                    unchanged += 1
+                    continue
+                new_entries.setdefault(entry["id"], entry)
+        if reached_mark or len(entries) < limit:
+            break
+        offset += limit
+
+    if snapshot is not None:
+        snapshot.close()
+    print(f"{len(new_entries)} new {kind} found in {requests_made} requests"
+          + (f" ({unchanged} already in the snapshot unchanged)." if unchanged else "."))
+    if new_entries:
+        delta_dir = os.path.join(output_dir, "delta")
+        os.makedirs(delta_dir, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        path = os.path.join(delta_dir, f"page_{stamp}.json.gz")
+        page = {"data": {"entries": list(new_entries.values()), "count": len(new_entries)}}
+        write_atomic(path, gzip.compress(json.dumps(page).encode("utf-8")))
+        print(f"Saved new {kind} to '{path}'.")
+
+    # The mark moves past everything listed, including entries skipped as
+    # unchanged, so the next sync doesn't page through them again. It is saved
+    # after the delta file, so a failed write never skips entries.
+    new_state = later_mark(state, high_water_mark(listed))
+    if new_state != load_sync_state(output_dir):
+        save_sync_state(output_dir, new_state)
+
+def main():
+    parser = argparse.ArgumentParser(description="Download Poetry Foundation authors or poems to page files.")
+    parser.add_argument("kind", choices=["authors", "poems"])
+    parser.add_argument("--output-dir", help="Defaults to the kind name (authors/ or poems/).")
+    parser.add_argument("--limit", type=int, default=1000, help="Entries per page.")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent requests.")
+    parser.add_argument("--retries", type=int, default=3,
+                        help="Retries per request on connection errors and 429/5xx responses.")
+    parser.add_argument("--base-url", default=BASE_URL, help="GraphQL endpoint (e.g. a local stub server).")
+    parser.add_argument("--sync", action="store_true",
+                        help="Only fetch entries newer than the last scrape's high-water mark.")
+    parser.add_argument("--sync-limit", type=int, default=100, help="Entries per page in sync mode.")
+    args = parser.parse_args()
+
+    output_dir = args.output_dir or args.kind
+    os.makedirs(output_dir, exist_ok=True)
+    if args.sync:
+        sync(make_session(1, args.retries), args.base_url, args.kind, args.sync_limit, output_dir)
+        return
+    manifest = Manifest(output_dir, args.kind, args.limit)
+    session = make_session(args.workers, args.retries)
+
+    # The first page tells us the total count.
+    if manifest.data["count"] is None:
+        print("Fetching initial page...")
+        content, page = fetch_page(session, args.base_url, args.kind, args.limit, 0)
+        manifest.data["count"] = page["data"]["count"]
+        save_page(output_dir, manifest, 0, content, page)
+    total = manifest.data["count"]
+    print(f"Total {args.kind} found: {total}")
+
+    offsets = manifest.pending_offsets(output_dir)
+    print(f"{len(offsets)} pages to fetch.")
+    failed = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {
+            pool.submit(fetch_page, session, args.base_url, args.kind, args.limit, offset): offset
+            for offset in offsets
+        }
+        for future in as_completed(futures):
+            offset = futures[future]
+            try:
+                content, page = future.result()
+            except Exception as e:
+                print(f"Failed offset {offset}: {e}")
+                manifest.record(offset, status="failed", error=str(e))
+                failed += 1
+                continue
+            save_page(output_dir, manifest, offset, content, page)
+            print(f"Saved offset {offset}.")
+
+    if failed:
+        # Exit non-zero so cron and bench-pipeline.py notice the partial scrape.
+        sys.exit(f"{failed} pages failed; rerun to fetch only those.")
+    # A complete scrape is the baseline for later --sync runs, unless a sync
+    # already moved the mark past its first page.
+    previous = load_sync_state(output_dir)
+    state = later_mark(previous, high_water_mark(iter_entries(os.path.join(output_dir, page_filename(0)))))
+    if state and state != previous:
+        save_sync_state(output_dir, state)
+    print(f"All pages have been saved in the directory '{output_dir}'.")
+
+if __name__ == "__main__":
+    main()
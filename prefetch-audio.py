@@ -0,0 +1,115 @@
+import os
+import csv
+import json
+import shutil
+import argparse
+import psycopg2
+from dotenv import load_dotenv
+from audio_store import DEFAULT_STORE_PATH, AudioFetcher, AudioStore, parse_size
+
+# --- Database Connection ---
+def connect_db():
+    load_dotenv()
+    conn_str = os.environ.get("SUPABASE_DB_URL")
+    if not conn_str:
+         raise Exception("SUPABASE_DB_URL not set.")
+    return psycopg2.connect(conn_str)
+
+def query_items(sql, params=()):
+    conn = connect_db()
+    cur = conn.cursor()
+    cur.execute(sql, params)
+    items = [(str(poem_id), url) for poem_id, url in cur.fetchall() if url]
+    cur.close()
+    conn.close()
+    return items
+
+def region_items(bbox, limit):
+    min_lat, min_lon, max_lat, max_lon = bbox
+    return query_items("""
+        SELECT DISTINCT p.id, p.audio_url
+        FROM poems p
+        JOIN poem_locations pl ON pl.poem_id = p.id
+        JOIN locations l ON l.id = pl.location_id
+        WHERE p.audio_url IS NOT NULL
+          AND l.geom && ST_MakeEnvelope(%s, %s, %s, %s, 4326)::geography
+        LIMIT %s;
+    """, (min_lon, min_lat, max_lon, max_lat, limit))
+
+def nearby_items(lat, lon, radius_km, limit):
+    return query_items("""
+        SELECT DISTINCT p.id, p.audio_url
+        FROM poems p
+        JOIN poem_locations pl ON pl.poem_id = p.id
+        JOIN locations l ON l.id = pl.location_id
+        WHERE p.audio_url IS NOT NULL
+          AND ST_DWithin(l.geom, ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography, %s)
+        LIMIT %s;
+    """, (lon, lat, radius_km * 1000, limit))
+
+def csv_items(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return [(row[0], row[1]) for row in csv.reader(f) if len(row) >= 2 and row[1].startswith("http")]
+
+def add_to_bundle(playlist_path, store, paths):
+    """Copy fetched audio next to a flight bundle's playlist.json and point its poems at the copies."""
+    bundle_dir = os.path.dirname(os.path.abspath(playlist_path))
+    with open(playlist_path, "r", encoding="utf-8") as f:
+        bundle = json.load(f)
+    os.makedirs(os.path.join(bundle_dir, "audio"), exist_ok=True)
+    for poem in bundle["poems"]:
+        path = paths.get(str(poem["id"]))
+        if path is None:
+            continue
+        relative = "audio/" + os.path.basename(path)
+        target = os.path.join(bundle_dir, relative)
+        if not os.path.exists(target):
+            try:
+                os.link(os.path.join(store.root, path), target)
+            except OSError:
+                shutil.copyfile(os.path.join(store.root, path), target)
+        poem["audio_file"] = relative
+    tmp_path = playlist_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(bundle, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, playlist_path)
+    print(f"Bundle {playlist_path}: {sum(1 for p in bundle['poems'] if p.get('audio_file'))} of {len(bundle['poems'])} poems have local audio.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Download poem audio into a local content-addressed store.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--playlist", help="Flight bundle playlist.json; the audio is also copied into the bundle.")
+    source.add_argument("--bbox", help="min_lat,min_lon,max_lat,max_lon of the poems' locations.")
+    source.add_argument("--near", help="lat,lon; poems located within --radius km.")
+    source.add_argument("--sql", help="Query returning (poem id, audio url) rows.")
+    source.add_argument("--csv", help="CSV file of poem id,audio url rows.")
+    parser.add_argument("--radius", type=float, default=50.0, help="Radius in km for --near.")
+    parser.add_argument("--limit", type=int, default=10000, help="Poems at most for --bbox/--near.")
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH, help="Store directory.")
+    parser.add_argument("--max-size", default="2GB", help="Store size limit; least recently used files are evicted.")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent downloads.")
+    args = parser.parse_args()
+
+    if args.playlist:
+        with open(args.playlist, "r", encoding="utf-8") as f:
+            items = [(str(p["id"]), p["audio_url"]) for p in json.load(f)["poems"] if p.get("audio_url")]
+    elif args.bbox:
+        items = region_items([float(v) for v in args.bbox.split(",")], args.limit)
+    elif args.near:
+        lat, lon = (float(v) for v in args.near.split(","))
+        items = nearby_items(lat, lon, args.radius, args.limit)
+    elif args.sql:
+        items = query_items(args.sql)
+    else:
+        items = csv_items(args.csv)
+
+    store = AudioStore(args.store, parse_size(args.max_size))
+    paths, errors = AudioFetcher(store, workers=args.workers).fetch_all(items)
+    manifest = store.write_manifest()
+    print(f"Manifest: {len(manifest)} poems in {os.path.join(args.store, 'manifest.json')} "
+          f"({store.total_bytes() / 1024 ** 2:.1f} MiB stored).")
+    if args.playlist:
+        add_to_bundle(args.playlist, store, paths)
+
+if __name__ == "__main__":
+    main()
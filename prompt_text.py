@@ -0,0 +1,132 @@
+import re
+import hashlib
+from html import unescape
+from html.parser import HTMLParser
+
+# --- Prompt input preprocessing ---
+# Poem bodies and bios arrive as HTML, and the four bio sources often repeat
+# each other. Cleaning them before they reach a prompt saves model tokens, and
+# the cleaned text (not the raw HTML) is what the LLM cache is keyed on.
+
+DEFAULT_POEM_TOKENS = 1500
+DEFAULT_BIO_TOKENS = 1000
+# Rough characters-per-token ratio for English text; close enough for a budget.
+CHARS_PER_TOKEN = 4
+
+BLOCK_TAGS = {"p", "br", "div", "li", "ul", "ol", "blockquote", "h1", "h2", "h3", "h4", "h5", "h6", "tr", "hr"}
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style"):
+            self.skip += 1
+        elif tag in BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style"):
+            self.skip = max(0, self.skip - 1)
+        elif tag in BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self.skip:
+            self.parts.append(data)
+
+def strip_html(html):
+    """Return the text of `html`, one line per line break or block, without blank-line runs."""
+    if not html:
+        return ""
+    extractor = _TextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    text = unescape("".join(extractor.parts)).replace("\xa0", " ")
+    lines = [" ".join(line.split()) for line in text.split("\n")]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def truncate_to_budget(text, max_tokens):
+    """Cut `text` to about `max_tokens`, at a line break when there is one close by, else at a word."""
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text.rfind("\n", 0, limit)
+    if cut < limit // 2:
+        cut = text.rfind(" ", 0, limit)
+    return text[:cut if cut > 0 else limit].rstrip()
+
+def _shingles(paragraph, size=3):
+    words = re.findall(r"\w+", paragraph.casefold())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def dedupe_paragraphs(paragraphs, seen=None, threshold=0.8):
+    """
+    Drop paragraphs whose word 3-grams are mostly (`threshold`) contained in the
+    paragraphs kept before them, keeping the first occurrence of repeated text.
+    Pass the same `seen` set to dedupe across several calls.
+    """
+    seen = set() if seen is None else seen
+    kept = []
+    for paragraph in paragraphs:
+        shingles = _shingles(paragraph)
+        if not shingles:
+            continue
+        if len(shingles & seen) / len(shingles) >= threshold:
+            continue
+        seen |= shingles
+        kept.append(paragraph)
+    return kept
+
+def clean_poem(body, max_tokens=DEFAULT_POEM_TOKENS):
+    return truncate_to_budget(strip_html(body), max_tokens)
+
+def clean_bios(bios, max_tokens=DEFAULT_BIO_TOKENS):
+    """
+    `bios` is a list of (label, html) pairs. Returns "Bio (label): ..." sections
+    holding only the paragraphs not already covered by an earlier bio.
+    """
+    seen = set()
+    sections = []
+    for label, html in bios:
+        kept = dedupe_paragraphs(strip_html(html).split("\n"), seen)
+        if kept:
+            sections.append(f"Bio ({label}): " + "\n".join(kept))
+    return truncate_to_budget("\n".join(sections), max_tokens)
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def store_prompt_texts(cur, table, texts):
+    """Persist {id: cleaned text} with its hash in `table`, skipping rows where it is unchanged."""
+    if not texts:
+        return
+    ids = list(texts)
+    cleaned = [texts[i] for i in ids]
+    cur.execute(f"""
+        UPDATE {table} t
+        SET prompt_text = u.prompt_text, prompt_text_hash = u.prompt_text_hash
+        FROM unnest(%s, %s, %s) AS u(id, prompt_text, prompt_text_hash)
+        WHERE t.id = u.id AND t.prompt_text_hash IS DISTINCT FROM u.prompt_text_hash;
+    """, (ids, cleaned, [text_hash(text) for text in cleaned]))
+
+class InputStats:
+    """Running totals of estimated prompt tokens before and after cleaning."""
+    def __init__(self):
+        self.raw = 0
+        self.cleaned = 0
+
+    def add(self, raw, cleaned):
+        self.raw += estimate_tokens(raw)
+        self.cleaned += estimate_tokens(cleaned)
+
+    def summary(self):
+        saved = 1 - self.cleaned / self.raw if self.raw else 0.0
+        return f"Prompt input: ~{self.raw} tokens raw, ~{self.cleaned} after cleaning ({saved:.0%} less)"
@@ -0,0 +1,126 @@
+import csv
+import math
+import xml.etree.ElementTree as ET
+
+EARTH_RADIUS_KM = 6371.0088
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def great_circle_points(start, end, step_km=5.0):
+    """Points every ~`step_km` along the great circle from `start` to `end` ((lat, lon) pairs), both included."""
+    lat1, lon1 = map(math.radians, start)
+    lat2, lon2 = map(math.radians, end)
+    total = haversine_km(*start, *end)
+    steps = max(1, math.ceil(total / step_km))
+    delta = total / EARTH_RADIUS_KM
+    if delta == 0:
+        return [start, end]
+    points = []
+    for i in range(steps + 1):
+        f = i / steps
+        a = math.sin((1 - f) * delta) / math.sin(delta)
+        b = math.sin(f * delta) / math.sin(delta)
+        x = a * math.cos(lat1) * math.cos(lon1) + b * math.cos(lat2) * math.cos(lon2)
+        y = a * math.cos(lat1) * math.sin(lon1) + b * math.cos(lat2) * math.sin(lon2)
+        z = a * math.sin(lat1) + b * math.sin(lat2)
+        points.append((math.degrees(math.atan2(z, math.hypot(x, y))), math.degrees(math.atan2(y, x))))
+    return points
+
+def densify(points, step_km=5.0):
+    """Insert great-circle points so no two consecutive track points are more than `step_km` apart."""
+    dense = [points[0]]
+    for start, end in zip(points, points[1:]):
+        dense.extend(great_circle_points(start, end, step_km)[1:])
+    return dense
+
+# --- Route sources ---
+def load_gpx(path):
+    """(lat, lon) of every track point (or route point) in a GPX file, in order."""
+    root = ET.parse(path).getroot()
+    points = [
+        (float(el.get("lat")), float(el.get("lon")))
+        for el in root.iter()
+        if el.tag.rsplit("}", 1)[-1] in ("trkpt", "rtept")
+    ]
+    if len(points) < 2:
+        raise ValueError(f"{path} has fewer than two track points.")
+    return points
+
+def load_csv_track(path):
+    """(lat, lon) per row of a CSV with lat/latitude and lon/lng/longitude columns."""
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        fields = {name.strip().lower(): name for name in reader.fieldnames or []}
+        lat_field = fields.get("lat") or fields.get("latitude")
+        lon_field = fields.get("lon") or fields.get("lng") or fields.get("longitude")
+        if not lat_field or not lon_field:
+            raise ValueError(f"{path} needs lat and lon columns.")
+        points = [(float(row[lat_field]), float(row[lon_field])) for row in reader if row[lat_field]]
+    if len(points) < 2:
+        raise ValueError(f"{path} has fewer than two track points.")
+    return points
+
+def load_airports(path):
+    """{code: (lat, lon, name)} from OurAirports' airports.csv, keyed by IATA code and ICAO ident."""
+    airports = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            entry = (float(row["latitude_deg"]), float(row["longitude_deg"]), row["name"])
+            if row.get("iata_code"):
+                airports[row["iata_code"].upper()] = entry
+            airports.setdefault(row["ident"].upper(), entry)
+    return airports
+
+# --- Route ---
+class Route:
+    """
+    A densified polyline with the distance flown at each vertex. Vertices are
+    bucketed into 1-degree cells, so finding the closest approach to a point
+    only looks at the vertices near it.
+    """
+    def __init__(self, points, step_km=5.0):
+        self.points = densify(points, step_km)
+        self.along = [0.0]
+        for (lat1, lon1), (lat2, lon2) in zip(self.points, self.points[1:]):
+            self.along.append(self.along[-1] + haversine_km(lat1, lon1, lat2, lon2))
+        self.cells = {}
+        for i, (lat, lon) in enumerate(self.points):
+            self.cells.setdefault((math.floor(lat), math.floor(lon) % 360), []).append(i)
+
+    @property
+    def length_km(self):
+        return self.along[-1]
+
+    def closest_approach(self, lat, lon, corridor_km):
+        """Return (km flown, distance in km) at the vertex closest to (lat, lon), or None if none is within `corridor_km`."""
+        dlat = corridor_km / 111.0
+        dlon = corridor_km / (111.0 * max(math.cos(math.radians(min(abs(lat) + dlat, 89.0))), 0.01))
+        best = None
+        for cell_lat in range(math.floor(lat - dlat), math.floor(lat + dlat) + 1):
+            if dlon >= 180:
+                cell_lons = range(360)
+            else:
+                cell_lons = range(math.floor(lon - dlon), math.floor(lon + dlon) + 1)
+            for cell_lon in cell_lons:
+                for i in self.cells.get((cell_lat, cell_lon % 360), ()):
+                    distance = haversine_km(lat, lon, *self.points[i])
+                    if distance <= corridor_km and (best is None or distance < best[1]):
+                        best = (self.along[i], distance)
+        return best
+
+    def simplified(self, every_km=50.0):
+        # Fewer points for drawing the route on the map.
+        kept = [self.points[0]]
+        last = 0.0
+        for point, along in zip(self.points, self.along):
+            if along - last >= every_km:
+                kept.append(point)
+                last = along
+        if kept[-1] != self.points[-1]:
+            kept.append(self.points[-1])
+        return [[round(lat, 4), round(lon, 4)] for lat, lon in kept]
@@ -0,0 +1,229 @@
+import os
+import sys
+import glob
+import json
+import mmap
+import struct
+import bisect
+from array import array
+from collections import namedtuple
+from corpus import AUTHOR_COLUMNS, POEM_COLUMNS, author_row, poem_row, iter_entries
+
+# File layout: MAGIC, the u64 offset of a JSON footer, then 8-byte aligned
+# column sections, then the footer describing where each section lives.
+MAGIC = b"WSPSNAP1"
+SNAPSHOT_NAME = "snapshot.bin"
+NULL_INT = -2 ** 63
+
+# How each kind's page entries become table rows. post_date is kept for --sync.
+KINDS = {
+    "authors": (author_row, AUTHOR_COLUMNS + ("post_date",)),
+    "poems": (poem_row, POEM_COLUMNS + ("post_date",)),
+}
+
+def snapshot_path(directory):
+    return os.path.join(directory, SNAPSHOT_NAME)
+
+def page_files(directory):
+    """The full scrape's pages, then delta pages oldest first, so later versions of an entry win."""
+    pages = sorted(glob.glob(os.path.join(directory, "page_*.json*")))
+    deltas = glob.glob(os.path.join(directory, "delta", "page_*.json*"))
+    deltas += glob.glob(os.path.join(directory, "delta", "imported", "page_*.json*"))
+    return pages + sorted(deltas, key=os.path.basename)
+
+def source_stamps(files):
+    return {path: [os.path.getsize(path), int(os.path.getmtime(path))] for path in files}
+
+# --- Writing ---
+def _column_type(values):
+    """
+    "int" for JSON integers, "digits" for canonical decimal strings (ids and
+    years arrive as strings), "str" for other strings, else "json". Both
+    integer types are stored as fixed-width int64 and read back exactly as
+    they were written; a "json" column (e.g. 1950 next to "1960") stores each
+    value JSON-encoded, so every value keeps its own type.
+    """
+    present = [v for v in values if v is not None]
+    if present and all(type(v) is int and NULL_INT < v < 2 ** 63 for v in present):
+        return "int"
+    if present and all(type(v) is str and v.isascii() and v.isdigit() and v == str(int(v))
+                       and int(v) < 2 ** 63 for v in present):
+        return "digits"
+    if all(type(v) is str for v in present):
+        return "str"
+    return "json"
+
+def _pad(f):
+    f.write(b"\0" * (-f.tell() % 8))
+
+def _write_section(f, data):
+    _pad(f)
+    start = f.tell()
+    f.write(data)
+    return [start, len(data)]
+
+def write_snapshot(path, kind, rows, sources=None):
+    """Write row dicts (with the kind's columns) to a snapshot file at `path`."""
+    columns = KINDS[kind][1]
+    rows = list(rows)
+    tmp_path = path + ".tmp"
+    footer = {"version": 2, "kind": kind, "rows": len(rows), "byteorder": sys.byteorder,
+              "sources": sources or {}, "columns": {}}
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC + struct.pack("<Q", 0))
+        for name in columns:
+            values = [row.get(name) for row in rows]
+            kind_of = _column_type(values)
+            column = {"type": kind_of}
+            if kind_of in ("int", "digits"):
+                numbers = array("q", (NULL_INT if v is None else int(v) for v in values))
+                column["data"] = _write_section(f, numbers.tobytes())
+            else:
+                # Strings: one UTF-8 blob plus rows + 1 offsets into it; None is a null flag.
+                encode = str if kind_of == "str" else lambda v: json.dumps(v, ensure_ascii=False)
+                offsets = array("Q", [0])
+                blob = bytearray()
+                for value in values:
+                    if value is not None:
+                        blob += encode(value).encode("utf-8")
+                    offsets.append(len(blob))
+                column["offsets"] = _write_section(f, offsets.tobytes())
+                column["data"] = _write_section(f, bytes(blob))
+                if any(v is None for v in values):
+                    column["nulls"] = _write_section(f, bytes(v is None for v in values))
+            footer["columns"][name] = column
+        # Row numbers in id order, for lookups by id.
+        ids = [row.get("id") for row in rows]
+        order = sorted(range(len(rows)), key=lambda i: _id_key(ids[i]))
+        footer["id_order"] = _write_section(f, array("I", order).tobytes())
+        _pad(f)
+        footer_offset = f.tell()
+        f.write(json.dumps(footer).encode("utf-8"))
+        f.seek(len(MAGIC))
+        f.write(struct.pack("<Q", footer_offset))
+    os.replace(tmp_path, path)
+    return len(rows)
+
+def _id_key(value):
+    # Numeric ids sort numerically, anything else after them as text.
+    value = "" if value is None else str(value)
+    return (0, int(value), "") if value.isdigit() else (1, 0, value)
+
+def build_snapshot(directory, kind, path=None):
+    """Parse every page file under `directory` once and write its snapshot; returns (rows, path)."""
+    make_row = KINDS[kind][0]
+    files = page_files(directory)
+    rows = {}
+    for filepath in files:
+        for entry in iter_entries(filepath):
+            row = make_row(entry)
+            row["post_date"] = entry.get("postDate")
+            rows[row["id"]] = row
+    path = path or snapshot_path(directory)
+    return write_snapshot(path, kind, rows.values(), source_stamps(files)), path
+
+# --- Reading ---
+class Snapshot:
+    """
+    Read-only, memory-mapped view of a snapshot. Integer columns are exposed
+    as zero-copy int64 memoryviews and strings are only decoded when a row
+    asks for them; `get(id)` finds a row by binary search over the id order.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a corpus snapshot")
+        footer_offset = struct.unpack_from("<Q", self.map, len(MAGIC))[0]
+        self.footer = json.loads(self.map[footer_offset:])
+        if self.footer["byteorder"] != sys.byteorder:
+            raise ValueError(f"{path} was written on a {self.footer['byteorder']}-endian machine")
+        self.kind = self.footer["kind"]
+        self.columns = tuple(self.footer["columns"])
+        view = memoryview(self.map)
+        self._views = {}
+        for name, column in self.footer["columns"].items():
+            data = self._section(view, column["data"])
+            if column["type"] in ("int", "digits"):
+                self._views[name] = (column["type"], data.cast("q"), None, None)
+            else:
+                offsets = self._section(view, column["offsets"]).cast("Q")
+                nulls = self._section(view, column["nulls"]) if "nulls" in column else None
+                self._views[name] = (column["type"], data, offsets, nulls)
+        self.id_order = self._section(view, self.footer["id_order"]).cast("I")
+
+    @staticmethod
+    def _section(view, location):
+        start, length = location
+        return view[start:start + length]
+
+    def __len__(self):
+        return self.footer["rows"]
+
+    def column(self, name):
+        """The raw int64 values of an integer column (NULL_INT for nulls), without copying."""
+        return self._views[name][1]
+
+    def value(self, name, i):
+        kind_of, data, offsets, nulls = self._views[name]
+        if kind_of in ("str", "json"):
+            if nulls is not None and nulls[i]:
+                return None
+            text = str(data[offsets[i]:offsets[i + 1]], "utf-8")
+            return text if kind_of == "str" else json.loads(text)
+        number = data[i]
+        if number == NULL_INT:
+            return None
+        return number if kind_of == "int" else str(number)
+
+    def row(self, i, columns=None):
+        return {name: self.value(name, i) for name in (columns or self.columns)}
+
+    def rows(self, start=0, stop=None, columns=None):
+        for i in range(start, len(self) if stop is None else min(stop, len(self))):
+            yield self.row(i, columns)
+
+    def get(self, entry_id, columns=None):
+        """The row with id `entry_id`, or None."""
+        key = _id_key(entry_id)
+        pos = bisect.bisect_left(self.id_order, key, key=lambda i: _id_key(self.value("id", i)))
+        if pos < len(self.id_order) and _id_key(self.value("id", self.id_order[pos])) == key:
+            return self.row(self.id_order[pos], columns)
+        return None
+
+    def is_stale(self, directory):
+        """True when page files were added or changed after the snapshot was built."""
+        return source_stamps(page_files(directory)) != self.footer["sources"]
+
+    def close(self):
+        # The views must go before the mapping can be closed.
+        self._views = {}
+        self.id_order = None
+        self.map.close()
+        self.file.close()
+
+# --- Row sources for the importers ---
+class SnapshotPart(namedtuple("SnapshotPart", "path start stop")):
+    """A range of snapshot rows, imported like one page file."""
+    def __str__(self):
+        return f"{self.path}[{self.start}:{self.stop}]"
+
+def snapshot_parts(path, rows_per_part=1000):
+    snapshot = Snapshot(path)
+    total = len(snapshot)
+    snapshot.close()
+    return [SnapshotPart(path, start, min(start + rows_per_part, total)) for start in range(0, total, rows_per_part)]
+
+_open_snapshots = {}
+
+def iter_rows(source, make_row):
+    """Table rows from a page file (parsed with `make_row`) or from a SnapshotPart."""
+    if isinstance(source, SnapshotPart):
+        if source.path not in _open_snapshots:
+            # One mapping per process, shared by every part it imports.
+            _open_snapshots[source.path] = Snapshot(source.path)
+        yield from _open_snapshots[source.path].rows(source.start, source.stop)
+        return
+    for entry in iter_entries(source):
+        yield make_row(entry)
@@ -0,0 +1,4 @@
+-- Hash of each imported row's content, so re-imports only rewrite (and
+-- re-queue for location enrichment) the rows that actually changed.
+ALTER TABLE authors ADD COLUMN IF NOT EXISTS content_hash text;
+ALTER TABLE poems ADD COLUMN IF NOT EXISTS content_hash text;
@@ -0,0 +1,29 @@
+-- Lease-based work queue for the add-locations scripts. A row is claimable when
+-- it is pending, or when its lease has expired (worker died, or failure backoff
+-- elapsed) and it has attempts left.
+ALTER TABLE poems
+    ADD COLUMN IF NOT EXISTS enrich_status text NOT NULL DEFAULT 'pending',
+    ADD COLUMN IF NOT EXISTS enrich_worker text,
+    ADD COLUMN IF NOT EXISTS enrich_lease_until timestamptz,
+    ADD COLUMN IF NOT EXISTS enrich_attempts integer NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS enrich_error text;
+
+ALTER TABLE authors
+    ADD COLUMN IF NOT EXISTS enrich_status text NOT NULL DEFAULT 'pending',
+    ADD COLUMN IF NOT EXISTS enrich_worker text,
+    ADD COLUMN IF NOT EXISTS enrich_lease_until timestamptz,
+    ADD COLUMN IF NOT EXISTS enrich_attempts integer NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS enrich_error text;
+
+-- Everything already linked to a location has been enriched.
+UPDATE poems SET enrich_status = 'done'
+WHERE id IN (SELECT poem_id FROM poem_locations);
+UPDATE authors SET enrich_status = 'done'
+WHERE id IN (SELECT author_id FROM author_locations);
+
+CREATE INDEX IF NOT EXISTS poems_enrich_queue_idx
+    ON poems (id) WHERE enrich_status <> 'done' AND audio_url IS NOT NULL;
+CREATE INDEX IF NOT EXISTS authors_enrich_queue_idx
+    ON authors (id) WHERE enrich_status <> 'done';
+CREATE INDEX IF NOT EXISTS poems_author_audio_idx
+    ON poems (author_id) WHERE audio_url IS NOT NULL;
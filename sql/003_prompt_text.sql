@@ -0,0 +1,10 @@
+-- Cleaned prompt input (markup stripped, repeated bio paragraphs removed,
+-- capped at a token budget) and its sha256, written by the add-locations
+-- scripts when they claim a row.
+ALTER TABLE poems
+    ADD COLUMN IF NOT EXISTS prompt_text text,
+    ADD COLUMN IF NOT EXISTS prompt_text_hash text;
+
+ALTER TABLE authors
+    ADD COLUMN IF NOT EXISTS prompt_text text,
+    ADD COLUMN IF NOT EXISTS prompt_text_hash text;
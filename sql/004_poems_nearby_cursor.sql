@@ -0,0 +1,98 @@
+-- Keyset-paged replacement for get_poems_nearby(lat, lon, limit_param, offset_param).
+-- Rows come out in (distance, location id, poem id) order. Each row carries an
+-- opaque `cursor`; pass the last one back as cursor_param to get the next page.
+--
+-- The cursor names the last row's location and poem. Its distance is
+-- recomputed from that location's stored geometry, with the same expression
+-- the scan uses, so ties compare equal without a float ever leaving the
+-- database. A KNN scan of the GiST index on locations.geom then walks outwards
+-- from the origin: locations closer than the cursor are discarded at the
+-- index scan, before any poem is joined, and the scan stops as soon as a page
+-- is full and the next row is farther than its last one. Only the page's own
+-- ties are ever sorted.
+CREATE INDEX IF NOT EXISTS locations_geom_gist ON locations USING gist (geom);
+CREATE INDEX IF NOT EXISTS poem_locations_location_idx ON poem_locations (location_id);
+
+CREATE OR REPLACE FUNCTION get_poems_nearby_after(
+    lat double precision,
+    lon double precision,
+    limit_param integer DEFAULT 1,
+    cursor_param text DEFAULT NULL
+)
+RETURNS TABLE (
+    id poems.id%TYPE,
+    title text,
+    url text,
+    body text,
+    audio_url text,
+    author_id poems.author_id%TYPE,
+    location_description text,
+    geom json,
+    distance double precision,
+    cursor text
+)
+LANGUAGE plpgsql STABLE
+AS $$
+#variable_conflict use_column
+DECLARE
+    origin geography := ST_SetSRID(ST_MakePoint(lon, lat), 4326)::geography;
+    decoded text;
+    after_location bigint;
+    after_poem text;
+    after_distance double precision;
+    boundary double precision;
+    candidate record;
+    -- A declared cursor is planned for early exit, so this walks the GiST
+    -- index outwards instead of sorting every row up front.
+    candidates CURSOR FOR
+        SELECT l.id AS location_id, p.id::text AS poem_id, l.geom <-> origin AS distance
+        FROM locations l
+        JOIN poem_locations pl ON pl.location_id = l.id
+        JOIN poems p ON p.id = pl.poem_id
+        WHERE l.geom IS NOT NULL
+          AND p.audio_url IS NOT NULL
+          -- Lower bound on the location alone, so closer locations are dropped before the joins.
+          AND l.geom <-> origin >= coalesce(after_distance, 0)
+          AND (l.geom <-> origin, l.id, p.id::text)
+              > (coalesce(after_distance, -1), coalesce(after_location, 0), coalesce(after_poem, ''))
+        ORDER BY l.geom <-> origin;
+    location_ids bigint[] := '{}';
+    poem_ids text[] := '{}';
+BEGIN
+    IF limit_param < 1 THEN
+        RETURN;
+    END IF;
+    IF cursor_param IS NOT NULL THEN
+        -- cursor = base64("<location id>:<poem id>")
+        decoded := convert_from(decode(cursor_param, 'base64'), 'UTF8');
+        after_location := split_part(decoded, ':', 1)::bigint;
+        after_poem := substr(decoded, strpos(decoded, ':') + 1);
+        SELECT l.geom <-> origin INTO after_distance FROM locations l WHERE l.id = after_location;
+        IF after_distance IS NULL THEN
+            RAISE EXCEPTION 'get_poems_nearby_after: the cursor''s location no longer exists'
+                USING ERRCODE = 'invalid_parameter_value';
+        END IF;
+    END IF;
+
+    FOR candidate IN candidates
+    LOOP
+        -- Past a full page, keep reading only the rows tied with its last one.
+        EXIT WHEN boundary IS NOT NULL AND candidate.distance > boundary;
+        location_ids := location_ids || candidate.location_id::bigint;
+        poem_ids := poem_ids || candidate.poem_id;
+        IF cardinality(poem_ids) = limit_param THEN
+            boundary := candidate.distance;
+        END IF;
+    END LOOP;
+
+    RETURN QUERY
+    SELECT p.id, p.title, p.url, p.body, p.audio_url, p.author_id,
+           l.location_description, ST_AsGeoJSON(l.geom)::json, l.geom <-> origin,
+           replace(encode(convert_to(l.id::text || ':' || p.id::text, 'UTF8'), 'base64'), E'\n', '')
+    FROM unnest(location_ids, poem_ids) AS c(location_id, poem_id)
+    JOIN locations l ON l.id = c.location_id
+    JOIN poems p ON p.id::text = c.poem_id
+    ORDER BY l.geom <-> origin, l.id, p.id::text
+    LIMIT limit_param;
+END;
+$$;
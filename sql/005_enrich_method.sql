@@ -0,0 +1,9 @@
+-- How a finished row's locations were decided: 'model' (Gemini) or 'prepass'
+-- (stored as N/A because the gazetteer pre-pass found no place name). Rows
+-- finished before this column existed stay NULL. place-prepass-report.py only
+-- scores the pre-pass against rows the model decided.
+ALTER TABLE poems
+    ADD COLUMN IF NOT EXISTS enrich_method text;
+
+ALTER TABLE authors
+    ADD COLUMN IF NOT EXISTS enrich_method text;
@@ -0,0 +1,305 @@
+"""
+Local stand-ins for the external HTTP services the scripts talk to, for
+trying changes without touching the real APIs.
+
+    python stub_servers.py graphql --port 8765 --count 5000
+    python poetryfoundation-scrape.py poems --base-url http://127.0.0.1:8765/
+
+    python stub_servers.py audio --port 8768 --truncate-rate 0.3
+    python prefetch-audio.py --csv poems.csv   # poem_id,audio_url rows pointing at http://127.0.0.1:8768/audio/...
+
+    python stub_servers.py llm --port 8766 --error-rate 0.1
+    python stub_servers.py geocode --port 8767
+    GENAI_BASE_URL=http://127.0.0.1:8766/ \
+    GEOCODE_ENDPOINT=http://127.0.0.1:8767/maps/api/geocode/json \
+    python supabase-add-locations-poems.py
+"""
+import re
+import json
+import hashlib
+import time
+import random
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class StubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive across requests.
+    protocol_version = "HTTP/1.1"
+
+    def handle_request(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        stub = self.server.stub
+        if stub.latency:
+            time.sleep(stub.latency)
+        if stub.error_rate and stub.random.random() < stub.error_rate:
+            status, headers, payload = stub.error_response()
+        else:
+            status, headers, payload = stub.respond(self.command, self.path, self.headers, body)
+        stub.requests += 1
+        # A stub can cut the body short to simulate a dropped connection.
+        truncate = headers.pop("X-Stub-Truncate", None)
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(payload[:truncate] if truncate is not None else payload)
+        if truncate is not None:
+            self.close_connection = True
+
+    do_GET = do_POST = do_HEAD = handle_request
+
+    def log_message(self, format, *args):
+        pass
+
+class Stub:
+    """Base class: subclasses implement respond() and return (status, headers, body)."""
+    def __init__(self, latency=0.0, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+
+    def respond(self, method, path, headers, body):
+        raise NotImplementedError
+
+    def error_response(self):
+        # What an injected failure looks like; stubs override this to mimic quota errors.
+        return 503, {"Content-Type": "text/plain"}, b"stub error"
+
+def json_response(data, status=200):
+    return status, {"Content-Type": "application/json"}, json.dumps(data).encode("utf-8")
+
+# --- Poetry Foundation GraphQL ---
+class GraphQLStub(Stub):
+    """
+    Serves SearchPoetEntries / SearchEntries pages over a synthetic corpus,
+    newest first. Raising `count` while running simulates newly posted entries.
+    With `places`, bios and poems mention that many distinct stub_town() places
+    instead of always Portland and the Columbia River; poets and their poems
+    share them, as real ones tend to.
+    """
+    def __init__(self, count=2500, places=0, **kwargs):
+        super().__init__(**kwargs)
+        self.count = count
+        self.places = places
+        self.epoch = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+    def author_id(self, i):
+        return 100000 + i % max(self.count // 4, 1)
+
+    def place(self, author_id, default):
+        return stub_town(author_id % self.places) if self.places else default
+
+    def post_date(self, i):
+        return (self.epoch + timedelta(hours=i)).isoformat()
+
+    def author(self, i):
+        return {
+            "id": str(100000 + i),
+            "postDate": self.post_date(i),
+            "title": f"Poet {i}",
+            "url": f"https://example.org/poets/{i}",
+            "birthYear": str(1800 + i % 200),
+            "deathYear": None if i % 3 else str(1870 + i % 150),
+            "foundationBio": f"<p>Poet {i} was born in {self.place(100000 + i, 'Portland, Oregon')}.</p>",
+            "galeBio": None,
+            "poetryBio": None,
+            "polBio": None
+        }
+
+    def poem(self, i):
+        return {
+            "id": str(200000 + i),
+            "postDate": self.post_date(i),
+            "title": f"Poem {i}",
+            "url": f"https://example.org/poems/{i}",
+            "body": f"<p>Line one of poem {i}<br>by the {self.place(self.author_id(i), 'Columbia River')}</p>",
+            "authors": [{"id": str(self.author_id(i))}],
+            "audioVersion": [{"audioFile": [{"url": f"https://example.org/audio/{i}.mp3"}]}] if i % 2 == 0 else []
+        }
+
+    def respond(self, method, path, headers, body):
+        request = json.loads(body or b"{}")
+        variables = request.get("variables") or {}
+        offset = variables.get("offset", 0)
+        limit = variables.get("limit", 1000)
+        make = self.author if request.get("operationName") == "SearchPoetEntries" else self.poem
+        # Entry i is the i-th oldest, so newest-first position p holds entry count - 1 - p.
+        entries = [make(self.count - 1 - p) for p in range(offset, min(offset + limit, self.count))]
+        return json_response({"data": {"entries": entries, "count": self.count}})
+
+# --- Gemini generateContent ---
+# Place names the LLM stub "finds" when they appear in a prompt.
+STUB_PLACES = {
+    "Portland": "Portland, OR, US",
+    "Oregon": "Oregon, US",
+    "Columbia River": "Columbia River, US",
+    "Paris": "Paris, France",
+    "Sahara": "Sahara Desert, Africa",
+    "Mount Hood": "Mount Hood, Oregon, US",
+}
+
+# Synthetic place names (GraphQLStub `places`), each found as "<name>, US". They
+# share no common prefix, so the fuzzy location matching keeps them apart.
+STUB_SYLLABLES = ("ka", "lo", "mi", "nu", "pe", "ra", "si", "to", "vu", "ze")
+STUB_TOWN = re.compile(r"\b(?:%s)(?:%s){2,}\b" % ("|".join(s.capitalize() for s in STUB_SYLLABLES), "|".join(STUB_SYLLABLES)))
+
+def stub_town(n):
+    return "".join(STUB_SYLLABLES[int(digit)] for digit in f"{n:03d}").capitalize()
+
+# Markers where the entity text starts, after the fixed rules and examples.
+STUB_SUBJECT_MARKERS = ("Poet Name:", "Title:")
+
+class LLMStub(Stub):
+    """
+    Answers generateContent with a JSON array of the STUB_PLACES found in the
+    prompt's subject text, or with one {"id", "locations"} object per entity
+    for batched prompts.
+    """
+    def subject(self, prompt):
+        starts = [prompt.find(marker) for marker in STUB_SUBJECT_MARKERS if marker in prompt]
+        return prompt[min(starts):] if starts else prompt
+
+    def places(self, subject):
+        found = [place for name, place in STUB_PLACES.items() if name in subject]
+        found += [f"{name}, US" for name in dict.fromkeys(STUB_TOWN.findall(subject))]
+        return found or ["N/A"]
+
+    def respond(self, method, path, headers, body):
+        request = json.loads(body or b"{}")
+        prompt = "".join(
+            part.get("text", "")
+            for content in request.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        if "\nID: " in prompt:
+            # Batched prompt: one {"id", "locations"} answer per "ID: <id>" section.
+            answer = []
+            for section in prompt.split("\nID: ")[1:]:
+                entity_id, _, subject = section.partition("\n")
+                answer.append({"id": entity_id.strip(), "locations": self.places(subject)})
+        else:
+            answer = self.places(self.subject(prompt))
+        text = json.dumps(answer)
+        return json_response({
+            "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}],
+            "usageMetadata": {
+                "promptTokenCount": len(prompt) // 4,
+                "candidatesTokenCount": len(text) // 4,
+                "totalTokenCount": (len(prompt) + len(text)) // 4
+            }
+        })
+
+    def error_response(self):
+        return json_response({"error": {"code": 429, "message": "Resource has been exhausted", "status": "RESOURCE_EXHAUSTED"}}, 429)
+
+# --- Google Geocoding ---
+class GeocodeStub(Stub):
+    """Geocodes any address to a stable pseudo-random point; addresses containing "Nowhere" return ZERO_RESULTS."""
+    def respond(self, method, path, headers, body):
+        address = parse_qs(urlparse(path).query).get("address", [""])[0]
+        if not address or "Nowhere" in address:
+            return json_response({"status": "ZERO_RESULTS", "results": []})
+        digest = hashlib.sha256(address.encode("utf-8")).digest()
+        lat = int.from_bytes(digest[:4], "big") / 2 ** 32 * 140 - 60
+        lng = int.from_bytes(digest[4:8], "big") / 2 ** 32 * 360 - 180
+        return json_response({
+            "status": "OK",
+            "results": [{"formatted_address": address, "geometry": {"location": {"lat": lat, "lng": lng}}}]
+        })
+
+    def error_response(self):
+        return json_response({"status": "OVER_QUERY_LIMIT", "results": []})
+
+# --- Audio files ---
+class AudioStub(Stub):
+    """
+    Serves deterministic pseudo-audio at /audio/<name>.mp3 with an ETag and
+    single-range `Range: bytes=N-` support. With `truncate_rate`, that fraction
+    of responses is cut off halfway so clients have to resume.
+    """
+    def __init__(self, size=256 * 1024, truncate_rate=0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.size = size
+        self.truncate_rate = truncate_rate
+
+    def content(self, name):
+        # Sizes vary per file so stores see a realistic mix.
+        seed = hashlib.sha256(name.encode("utf-8")).digest()
+        size = self.size // 2 + int.from_bytes(seed[:4], "big") % self.size
+        return (seed * (size // len(seed) + 1))[:size]
+
+    def respond(self, method, path, headers, body):
+        path = urlparse(path).path
+        if not path.startswith("/audio/"):
+            return 404, {"Content-Type": "text/plain"}, b"not found"
+        content = self.content(path[len("/audio/"):])
+        etag = '"' + hashlib.sha256(content).hexdigest()[:16] + '"'
+        response_headers = {"Content-Type": "audio/mpeg", "ETag": etag, "Accept-Ranges": "bytes"}
+        status, payload = 200, content
+        range_header = headers.get("Range", "")
+        if range_header.startswith("bytes=") and headers.get("If-Range", etag) == etag:
+            start = int(range_header[len("bytes="):].split("-", 1)[0] or 0)
+            if start >= len(content):
+                response_headers["Content-Range"] = f"bytes */{len(content)}"
+                return 416, response_headers, b""
+            status, payload = 206, content[start:]
+            response_headers["Content-Range"] = f"bytes {start}-{len(content) - 1}/{len(content)}"
+        if self.truncate_rate and len(payload) > 1 and self.random.random() < self.truncate_rate:
+            response_headers["X-Stub-Truncate"] = len(payload) // 2
+        return status, response_headers, payload
+
+STUBS = {
+    "graphql": GraphQLStub,
+    "llm": LLMStub,
+    "geocode": GeocodeStub,
+    "audio": AudioStub,
+}
+
+def serve(stub, host="127.0.0.1", port=0):
+    """Start `stub` on a background thread; returns the server (see server.server_address)."""
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.stub = stub
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stub of an external service.")
+    parser.add_argument("service", choices=sorted(STUBS))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of delay per request.")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fraction of requests answered with an error: 429 RESOURCE_EXHAUSTED for llm, "
+                             "OVER_QUERY_LIMIT for geocode, 503 for graphql and audio.")
+    parser.add_argument("--count", type=int, default=2500, help="Corpus size for the graphql stub.")
+    parser.add_argument("--places", type=int, default=0,
+                        help="Distinct synthetic places mentioned across the graphql stub's corpus.")
+    parser.add_argument("--size", type=int, default=256 * 1024, help="Typical file size for the audio stub.")
+    parser.add_argument("--truncate-rate", type=float, default=0.0,
+                        help="Fraction of audio responses cut off halfway.")
+    args = parser.parse_args()
+
+    kwargs = {"latency": args.latency, "error_rate": args.error_rate}
+    if args.service == "graphql":
+        kwargs["count"] = args.count
+        kwargs["places"] = args.places
+    if args.service == "audio":
+        kwargs["size"] = args.size
+        kwargs["truncate_rate"] = args.truncate_rate
+    server = serve(STUBS[args.service](**kwargs), args.host, args.port)
+    print(f"Stub {args.service} listening on http://{args.host}:{server.server_address[1]}/")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
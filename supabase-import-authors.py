@@ -1,8 +1,16 @@
 import os
-import json
+import sys
 import glob
+import time
+import argparse
+import functools
 import psycopg2
 from dotenv import load_dotenv
+from corpus import AUTHOR_COLUMNS, author_row, archive_delta
+from bulk_load import create_stage, stage_rows, merge_staged
+from parallel_import import import_files, record_import
+from metrics import CountingCursor, add_metrics_arguments, default_metrics, metrics_from_args
+from snapshot import Snapshot, iter_rows, snapshot_parts, snapshot_path
 
 def connect_db():
     from dotenv import load_dotenv
@@ -11,76 +19,172 @@ def connect_db():
     conn_str = os.environ.get("SUPABASE_DB_URL")
     if not conn_str:
          raise Exception("Database connection information not available")
-    return psycopg2.connect(conn_str)
+    return psycopg2.connect(conn_str, cursor_factory=CountingCursor)
 
-def insert_author(cur, author):
-    # Map JSON field names to our table's columns.
+def upsert_author(cur, row):
+    # Insert new authors and rewrite changed ones. Changed authors lose their
+    # location links and go back on the enrichment queue.
     sql = """
-        INSERT INTO authors (
-            id,
-            title,
-            url,
-            birth_year,
-            death_year,
-            bio_foundation,
-            bio_gale,
-            bio_poetry,
-            bio_pol
+        WITH old AS (
+            SELECT content_hash FROM authors WHERE id = %(id)s
+        ), upserted AS (
+            INSERT INTO authors (
+                id,
+                title,
+                url,
+                birth_year,
+                death_year,
+                bio_foundation,
+                bio_gale,
+                bio_poetry,
+                bio_pol,
+                content_hash
+            )
+            VALUES (
+                %(id)s,
+                %(title)s,
+                %(url)s,
+                %(birth_year)s,
+                %(death_year)s,
+                %(bio_foundation)s,
+                %(bio_gale)s,
+                %(bio_poetry)s,
+                %(bio_pol)s,
+                %(content_hash)s
+            )
+            ON CONFLICT (id) DO UPDATE SET
+                title = EXCLUDED.title,
+                url = EXCLUDED.url,
+                birth_year = EXCLUDED.birth_year,
+                death_year = EXCLUDED.death_year,
+                bio_foundation = EXCLUDED.bio_foundation,
+                bio_gale = EXCLUDED.bio_gale,
+                bio_poetry = EXCLUDED.bio_poetry,
+                bio_pol = EXCLUDED.bio_pol,
+                content_hash = EXCLUDED.content_hash,
+                -- Rows imported before hashing existed only get their hash backfilled.
+                enrich_status = CASE WHEN authors.content_hash IS NULL
+                                     THEN authors.enrich_status ELSE 'pending' END,
+                enrich_attempts = CASE WHEN authors.content_hash IS NULL
+                                       THEN authors.enrich_attempts ELSE 0 END
+            WHERE authors.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+            RETURNING id
+        ), requeued AS (
+            SELECT id FROM upserted
+            WHERE (SELECT content_hash FROM old) IS NOT NULL
+        ), unlinked AS (
+            DELETE FROM author_locations
+            WHERE author_id IN (SELECT id FROM requeued)
         )
-        VALUES (
-            %(id)s,
-            %(title)s,
-            %(url)s,
-            %(birth_year)s,
-            %(death_year)s,
-            %(bio_foundation)s,
-            %(bio_gale)s,
-            %(bio_poetry)s,
-            %(bio_pol)s
-        )
-        ON CONFLICT (id) DO NOTHING;
+        SELECT
+            NOT EXISTS (SELECT 1 FROM old),
+            EXISTS (SELECT 1 FROM upserted),
+            EXISTS (SELECT 1 FROM requeued);
     """
-    data = {
-        "id": author.get("id"),
-        "title": author.get("title"),
-        "url": author.get("url"),
-        "birth_year": author.get("birthYear"),
-        "death_year": author.get("deathYear"),
-        "bio_foundation": author.get("foundationBio"),
-        "bio_gale": author.get("galeBio"),
-        "bio_poetry": author.get("poetryBio"),
-        "bio_pol": author.get("polBio")
-    }
-    cur.execute(sql, data)
+    cur.execute(sql, row)
+    return cur.fetchone()
 
 def process_file(filepath, cur):
-    print(f"Processing file: {filepath}")
-    with open(filepath, "r", encoding="utf-8") as f:
-        data = json.load(f)
-        entries = data.get("data", {}).get("entries", [])
-        for author in entries:
-            insert_author(cur, author)
+    metrics = default_metrics()
+    metrics.log(f"Processing file: {filepath}")
+    count = inserted = updated = requeued = 0
+    for row in iter_rows(filepath, author_row):
+        is_new, written, was_requeued = upsert_author(cur, row)
+        count += 1
+        inserted += is_new
+        updated += written and not is_new
+        requeued += was_requeued
+    metrics.log(f"{count} authors: {inserted} new, {updated} changed, {requeued} re-queued for enrichment.")
+    return count
+
+# --- Bulk mode: stream the file through COPY into a staging table, then merge once ---
+def bulk_load_file(filepath, cur):
+    metrics = default_metrics()
+    metrics.log(f"Bulk loading file: {filepath}")
+    rows = iter_rows(filepath, author_row)
+    count = stage_rows(cur, "authors", AUTHOR_COLUMNS, rows)
+    inserted, updated, requeued = merge_staged(cur, "authors", AUTHOR_COLUMNS, "author_locations", "author_id")
+    metrics.log(f"Staged {count} authors: {inserted} new, {updated} changed, {requeued} re-queued for enrichment.")
+    return count
 
 def main():
+    parser = argparse.ArgumentParser(description="Import scraped author pages into Supabase.")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Stage each file with COPY and merge it in one statement.")
+    parser.add_argument("--delta", action="store_true",
+                        help="Import only the new entries written by `poetryfoundation-scrape.py --sync`.")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="Import from the snapshot written by build-snapshot.py instead of parsing the page files.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Import files in this many processes, each with its own connection.")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    metrics = metrics_from_args(args)
+
     # Adjust this glob pattern to match the location of your 6 JSON files with author data.
-    json_files_path = "authors/*.json"  # <-- Replace with your actual path
-    files = glob.glob(json_files_path)
+    json_files_path = "authors/page_*.json*"  # <-- Replace with your actual path
+    if args.delta:
+        json_files_path = "authors/delta/page_*.json*"
+    files = sorted(glob.glob(json_files_path))
+    if args.snapshot:
+        if args.delta:
+            parser.error("--snapshot already holds the delta pages; use one or the other.")
+        path = snapshot_path("authors")
+        if not os.path.exists(path):
+            print(f"No snapshot at {path}; run `python build-snapshot.py authors` first.")
+            return
+        snapshot = Snapshot(path)
+        if snapshot.is_stale("authors"):
+            print(f"Warning: page files changed since {path} was built; rebuild it to import them.")
+        snapshot.close()
+        # Row ranges of the snapshot take the place of page files.
+        files = snapshot_parts(path)
     if not files:
         print("No JSON files found. Check your file path.")
         return
 
+    if args.workers > 1 and args.delta:
+        # Delta files can hold successive versions of one entry; they must be applied in order.
+        print("Delta files are imported in order; ignoring --workers.")
+    elif args.workers > 1:
+        failed = import_files(
+            files,
+            bulk_load_file if args.bulk else process_file,
+            connect_db,
+            args.workers,
+            setup=functools.partial(create_stage, table="authors", columns=AUTHOR_COLUMNS) if args.bulk else None,
+        )
+        metrics.close()
+        if failed:
+            sys.exit(f"{len(failed)} files were rolled back; rerun to retry them.")
+        print("Authors import complete.")
+        return
+
     conn = connect_db()
     cur = conn.cursor()
+    if args.bulk:
+        create_stage(cur, "authors", AUTHOR_COLUMNS)
 
     # Process each file and commit after each file.
     for filepath in files:
-        process_file(filepath, cur)
-        conn.commit()
-        print(f"Finished processing: {filepath}")
+        round_trips = metrics.value("db_round_trips_total", stage="import")
+        start = time.perf_counter()
+        with metrics.stage("import"):
+            if args.bulk:
+                count = bulk_load_file(filepath, cur)
+            else:
+                count = process_file(filepath, cur)
+            conn.commit()
+        elapsed = time.perf_counter() - start
+        record_import(filepath, count, elapsed, metrics.value("db_round_trips_total", stage="import") - round_trips)
+        metrics.log(f"Finished processing: {filepath} ({count} rows in {elapsed:.2f}s, {count / max(elapsed, 1e-9):.0f} rows/s)")
+        if args.delta:
+            archive_delta(filepath)
 
     cur.close()
     conn.close()
+    metrics.close()
     print("Authors import complete.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,85 +1,192 @@
 import os
-import json
+import sys
 import glob
+import time
+import argparse
+import functools
+import subprocess
 import psycopg2
 from dotenv import load_dotenv
+from corpus import POEM_COLUMNS, poem_row, archive_delta
+from bulk_load import create_stage, stage_rows, merge_staged
+from parallel_import import import_files, record_import
+from metrics import CountingCursor, add_metrics_arguments, default_metrics, metrics_from_args
+from snapshot import Snapshot, iter_rows, snapshot_parts, snapshot_path
 
 def connect_db():
     load_dotenv()
     conn_str = os.environ.get("SUPABASE_DB_URL")
     if not conn_str:
          raise Exception("Database connection information not available")
-    return psycopg2.connect(conn_str)
-
-def insert_poem(cur, poem):
-    # Extract the primary author id (if available).
-    author_id = None
-    if poem.get("authors") and len(poem["authors"]) > 0:
-        author_id = poem["authors"][0].get("id")
-
-    # Extract the audio URL from the audioVersion field.
-    audio_url = None
-    if poem.get("audioVersion") and len(poem["audioVersion"]) > 0:
-        av = poem["audioVersion"][0]
-        if av.get("audioFile") and len(av["audioFile"]) > 0:
-            audio_url = av["audioFile"][0].get("url")
+    return psycopg2.connect(conn_str, cursor_factory=CountingCursor)
 
+def upsert_poem(cur, row):
+    # Insert new poems and rewrite changed ones. Changed poems lose their
+    # location links and go back on the enrichment queue.
     sql = """
-        INSERT INTO poems (
-            id,
-            title,
-            url,
-            body,
-            author_id,
-            audio_url
-        )
-        VALUES (
-            %(id)s,
-            %(title)s,
-            %(url)s,
-            %(body)s,
-            %(author_id)s,
-            %(audio_url)s
+        WITH old AS (
+            SELECT content_hash FROM poems WHERE id = %(id)s
+        ), upserted AS (
+            INSERT INTO poems (
+                id,
+                title,
+                url,
+                body,
+                author_id,
+                audio_url,
+                content_hash
+            )
+            VALUES (
+                %(id)s,
+                %(title)s,
+                %(url)s,
+                %(body)s,
+                %(author_id)s,
+                %(audio_url)s,
+                %(content_hash)s
+            )
+            ON CONFLICT (id) DO UPDATE SET
+                title = EXCLUDED.title,
+                url = EXCLUDED.url,
+                body = EXCLUDED.body,
+                author_id = EXCLUDED.author_id,
+                audio_url = EXCLUDED.audio_url,
+                content_hash = EXCLUDED.content_hash,
+                -- Rows imported before hashing existed only get their hash backfilled.
+                enrich_status = CASE WHEN poems.content_hash IS NULL
+                                     THEN poems.enrich_status ELSE 'pending' END,
+                enrich_attempts = CASE WHEN poems.content_hash IS NULL
+                                       THEN poems.enrich_attempts ELSE 0 END
+            WHERE poems.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+            RETURNING id
+        ), requeued AS (
+            SELECT id FROM upserted
+            WHERE (SELECT content_hash FROM old) IS NOT NULL
+        ), unlinked AS (
+            DELETE FROM poem_locations
+            WHERE poem_id IN (SELECT id FROM requeued)
         )
-        ON CONFLICT (id) DO NOTHING;
+        SELECT
+            NOT EXISTS (SELECT 1 FROM old),
+            EXISTS (SELECT 1 FROM upserted),
+            EXISTS (SELECT 1 FROM requeued);
     """
-    data = {
-        "id": poem.get("id"),
-        "title": poem.get("title"),
-        "url": poem.get("url"),
-        "body": poem.get("body"),
-        "author_id": author_id,
-        "audio_url": audio_url
-    }
-    cur.execute(sql, data)
+    cur.execute(sql, row)
+    return cur.fetchone()
 
 def process_file(filepath, cur):
-    print(f"Processing file: {filepath}")
-    with open(filepath, "r", encoding="utf-8") as f:
-        data = json.load(f)
-        entries = data.get("data", {}).get("entries", [])
-        for poem in entries:
-            insert_poem(cur, poem)
+    metrics = default_metrics()
+    metrics.log(f"Processing file: {filepath}")
+    count = inserted = updated = requeued = 0
+    for row in iter_rows(filepath, poem_row):
+        is_new, written, was_requeued = upsert_poem(cur, row)
+        count += 1
+        inserted += is_new
+        updated += written and not is_new
+        requeued += was_requeued
+    metrics.log(f"{count} poems: {inserted} new, {updated} changed, {requeued} re-queued for enrichment.")
+    return count
+
+# --- Bulk mode: stream the file through COPY into a staging table, then merge once ---
+def bulk_load_file(filepath, cur):
+    metrics = default_metrics()
+    metrics.log(f"Bulk loading file: {filepath}")
+    rows = iter_rows(filepath, poem_row)
+    count = stage_rows(cur, "poems", POEM_COLUMNS, rows)
+    inserted, updated, requeued = merge_staged(cur, "poems", POEM_COLUMNS, "poem_locations", "poem_id")
+    metrics.log(f"Staged {count} poems: {inserted} new, {updated} changed, {requeued} re-queued for enrichment.")
+    return count
 
 def main():
+    parser = argparse.ArgumentParser(description="Import scraped poem pages into Supabase.")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Stage each file with COPY and merge it in one statement.")
+    parser.add_argument("--delta", action="store_true",
+                        help="Import only the new entries written by `poetryfoundation-scrape.py --sync`.")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="Import from the snapshot written by build-snapshot.py instead of parsing the page files.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Import files in this many processes, each with its own connection.")
+    parser.add_argument("--skip-authors", action="store_true",
+                        help="With --workers, don't run supabase-import-authors.py first (the authors are already imported).")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    metrics = metrics_from_args(args)
+
+    if args.workers > 1 and not args.delta and not args.skip_authors:
+        # Parallel files commit in any order, so all authors are committed
+        # before the first poem that references one.
+        command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "supabase-import-authors.py"),
+                   "--workers", str(args.workers)]
+        command += ["--bulk"] * args.bulk + ["--delta"] * args.delta + ["--snapshot"] * args.snapshot
+        command += ["--log-level", args.log_level]
+        if args.metrics_events:
+            command += ["--metrics-events", args.metrics_events]
+        subprocess.run(command, check=True)
+
     # Adjust this glob pattern to match the location of your poem JSON files.
-    json_files_path = "poems/*.json"  # <-- Change this to your actual path if needed.
-    files = glob.glob(json_files_path)
+    json_files_path = "poems/page_*.json*"  # <-- Change this to your actual path if needed.
+    if args.delta:
+        json_files_path = "poems/delta/page_*.json*"
+    files = sorted(glob.glob(json_files_path))
+    if args.snapshot:
+        if args.delta:
+            parser.error("--snapshot already holds the delta pages; use one or the other.")
+        path = snapshot_path("poems")
+        if not os.path.exists(path):
+            print(f"No snapshot at {path}; run `python build-snapshot.py poems` first.")
+            return
+        snapshot = Snapshot(path)
+        if snapshot.is_stale("poems"):
+            print(f"Warning: page files changed since {path} was built; rebuild it to import them.")
+        snapshot.close()
+        # Row ranges of the snapshot take the place of page files.
+        files = snapshot_parts(path)
     if not files:
         print("No JSON files found. Check your file path.")
         return
 
+    if args.workers > 1 and args.delta:
+        # Delta files can hold successive versions of one entry; they must be applied in order.
+        print("Delta files are imported in order; ignoring --workers.")
+    elif args.workers > 1:
+        failed = import_files(
+            files,
+            bulk_load_file if args.bulk else process_file,
+            connect_db,
+            args.workers,
+            setup=functools.partial(create_stage, table="poems", columns=POEM_COLUMNS) if args.bulk else None,
+        )
+        metrics.close()
+        if failed:
+            sys.exit(f"{len(failed)} files were rolled back; rerun to retry them.")
+        print("Poems import complete.")
+        return
+
     conn = connect_db()
     cur = conn.cursor()
+    if args.bulk:
+        create_stage(cur, "poems", POEM_COLUMNS)
 
     for filepath in files:
-        process_file(filepath, cur)
-        conn.commit()  # Commit after processing each file.
-        print(f"Finished processing: {filepath}")
+        round_trips = metrics.value("db_round_trips_total", stage="import")
+        start = time.perf_counter()
+        with metrics.stage("import"):
+            if args.bulk:
+                count = bulk_load_file(filepath, cur)
+            else:
+                count = process_file(filepath, cur)
+            conn.commit()  # Commit after processing each file.
+        elapsed = time.perf_counter() - start
+        record_import(filepath, count, elapsed, metrics.value("db_round_trips_total", stage="import") - round_trips)
+        metrics.log(f"Finished processing: {filepath} ({count} rows in {elapsed:.2f}s, {count / max(elapsed, 1e-9):.0f} rows/s)")
+        if args.delta:
+            archive_delta(filepath)
 
     cur.close()
     conn.close()
+    metrics.close()
     print("Poems import complete.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
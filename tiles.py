@@ -0,0 +1,88 @@
+import os
+import json
+import hashlib
+
+# --- Geohash ---
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+def geohash_encode(lat, lon, precision):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits, bit_count, even = 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = bits * 2 + 1
+            rng[0] = mid
+        else:
+            bits = bits * 2
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+def geohash_bbox(geohash):
+    """(min_lat, min_lon, max_lat, max_lon) of a geohash cell."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if value >> shift & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+# --- Incremental static file output ---
+def content_digest(data):
+    # Stable digest of a JSON-serializable value; keys are sorted so equal content hashes equally.
+    return hashlib.sha256(json.dumps(data, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+def write_json_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+    os.replace(tmp_path, path)
+
+def load_index(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def sync_files(out_dir, files, previous_digests):
+    """
+    Write `files` ({relative path: data}) under `out_dir`, skipping any whose
+    digest matches `previous_digests`, and delete previously written files that
+    are gone. Returns ({relative path: digest}, written, unchanged, deleted).
+    """
+    digests = {}
+    written = unchanged = 0
+    for relative, data in files.items():
+        digest = content_digest(data)
+        digests[relative] = digest
+        full_path = os.path.join(out_dir, relative)
+        if previous_digests.get(relative) == digest and os.path.exists(full_path):
+            unchanged += 1
+            continue
+        write_json_atomic(full_path, data)
+        written += 1
+    deleted = 0
+    for relative in previous_digests:
+        if relative not in digests:
+            try:
+                os.remove(os.path.join(out_dir, relative))
+                deleted += 1
+            except FileNotFoundError:
+                pass
+    return digests, written, unchanged, deleted
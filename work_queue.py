@@ -0,0 +1,72 @@
+import os
+import socket
+
+# --- Claim-based enrichment queue over the enrich_* columns (sql/002_enrichment_queue.sql) ---
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def claim_batch(cur, table, columns, eligible_sql, limit, worker,
+                lease_seconds=600, max_attempts=3):
+    """
+    Lease up to `limit` rows of `table` to `worker` and return their `columns`.
+    SKIP LOCKED lets any number of workers on any machine claim concurrently
+    without ever receiving the same row. Expired claims with no attempts left
+    are marked 'failed' in the same statement, so a worker that died on a
+    row's last attempt doesn't leave it 'claimed' forever.
+    """
+    cols = ", ".join(f"t.{col}" for col in columns)
+    cur.execute(f"""
+        WITH abandoned AS (
+            UPDATE {table} t
+            SET enrich_status = 'failed',
+                enrich_error = 'lease expired',
+                enrich_lease_until = NULL
+            WHERE t.id IN (
+                SELECT id FROM {table}
+                WHERE ({eligible_sql})
+                  AND enrich_status = 'claimed'
+                  AND enrich_lease_until < now()
+                  AND enrich_attempts >= %(max_attempts)s
+                FOR UPDATE SKIP LOCKED
+            )
+        )
+        UPDATE {table} t
+        SET enrich_status = 'claimed',
+            enrich_worker = %(worker)s,
+            enrich_lease_until = now() + make_interval(secs => %(lease)s),
+            enrich_attempts = t.enrich_attempts + 1
+        WHERE t.id IN (
+            SELECT id FROM {table}
+            WHERE ({eligible_sql})
+              AND (enrich_status = 'pending'
+                   OR (enrich_status IN ('claimed', 'failed')
+                       AND enrich_lease_until < now()
+                       AND enrich_attempts < %(max_attempts)s))
+            ORDER BY id
+            LIMIT %(limit)s
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING {cols};
+    """, {"worker": worker, "lease": lease_seconds, "max_attempts": max_attempts, "limit": limit})
+    return cur.fetchall()
+
+def mark_done(cur, table, entity_id, worker, method="model"):
+    # Only the current lease holder may complete a row. `method` records who
+    # decided its locations (sql/005_enrich_method.sql).
+    cur.execute(f"""
+        UPDATE {table}
+        SET enrich_status = 'done', enrich_method = %s, enrich_lease_until = NULL, enrich_error = NULL
+        WHERE id = %s AND enrich_worker = %s AND enrich_status = 'claimed';
+    """, (method, entity_id, worker))
+    return cur.rowcount == 1
+
+def mark_failed(cur, table, entity_id, worker, error, retry_after_seconds=900):
+    # The lease doubles as a retry delay: the row becomes claimable again once it expires.
+    cur.execute(f"""
+        UPDATE {table}
+        SET enrich_status = 'failed',
+            enrich_error = %s,
+            enrich_lease_until = now() + make_interval(secs => %s)
+        WHERE id = %s AND enrich_worker = %s AND enrich_status = 'claimed';
+    """, (str(error)[:1000], retry_after_seconds, entity_id, worker))
+    return cur.rowcount == 1